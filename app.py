@@ -7,11 +7,14 @@ import tkinter.font as tkFont
 from tkinter import filedialog
 from sys import stderr, stdout
 import os.path
-from modules.MapExporter import exportMap
+from modules.Batch import convertMap
+from modules.TextureCache import TextureCache
+from modules.Manifest import purgeManifests
 import time 
 from threading import *
 import shutil
 from tempfile import gettempdir, tempdir
+from multiprocessing import cpu_count, freeze_support
 
 class App:
     def __init__(self, root: tk.Tk):
@@ -200,6 +203,18 @@ class App:
         checkRemoveSky["offvalue"] = False
         checkRemoveSky["onvalue"] = True
 
+        # only reconvert what changed since the last time the map was converted
+        self.incremental = tk.BooleanVar()
+        checkIncremental=tk.Checkbutton(root)
+        checkIncremental["font"] = ft
+        checkIncremental["fg"] = "#333333"
+        checkIncremental["justify"] = "left"
+        checkIncremental["text"] = "Incremental"
+        checkIncremental["variable"] = self.incremental
+        checkIncremental.place(x=660,y=310,width=90,height=30)
+        checkIncremental["offvalue"] = False
+        checkIncremental["onvalue"] = True
+
         consoleLabel=tk.Label(root)
         consoleLabel["font"] = ft
         consoleLabel["fg"] = "#333333"
@@ -264,6 +279,42 @@ class App:
         checkSkipModels.place(x=230,y=350,width=78,height=30)
         checkSkipModels["offvalue"] = False
         checkSkipModels["onvalue"] = True
+
+        workersLabel=tk.Label(root)
+        workersLabel["font"] = ft
+        workersLabel["fg"] = "#333333"
+        workersLabel["justify"] = "left"
+        workersLabel["text"] = "Workers"
+        workersLabel.place(x=360,y=350,width=50,height=30)
+
+        # the amount of processes used to solve and convert the brushes
+        self.workers = tk.IntVar(value=cpu_count())
+        workersBox=tk.Spinbox(root, from_=1, to=cpu_count(), textvariable=self.workers)
+        workersBox["font"] = ft
+        workersBox["fg"] = "#333333"
+        workersBox["justify"] = "left"
+        workersBox.place(x=420,y=355,width=50,height=20)
+
+        # converted textures are kept between runs so maps using the same textures don't convert them again
+        self.textureCache = tk.BooleanVar(value=True)
+        checkTextureCache=tk.Checkbutton(root)
+        checkTextureCache["font"] = ft
+        checkTextureCache["fg"] = "#333333"
+        checkTextureCache["justify"] = "left"
+        checkTextureCache["text"] = "Texture cache"
+        checkTextureCache["variable"] = self.textureCache
+        checkTextureCache.place(x=500,y=350,width=100,height=30)
+        checkTextureCache["offvalue"] = False
+        checkTextureCache["onvalue"] = True
+
+        purgeCacheButton=tk.Button(root)
+        purgeCacheButton["bg"] = "#f0f0f0"
+        purgeCacheButton["font"] = ft
+        purgeCacheButton["fg"] = "#000000"
+        purgeCacheButton["justify"] = "center"
+        purgeCacheButton["text"] = "Purge cache"
+        purgeCacheButton.place(x=660,y=350,width=114,height=30)
+        purgeCacheButton["command"] = self.purgeCacheButton_command
         self.vpkList.insert(0, "C:/stuff/Steam/steamapps/common/Counter-Strike Global Offensive/csgo/pak01_dir.vpk")
         self.gameDirList.insert(0, "C:/stuff/Steam/steamapps/common/Half-Life 2/hl2")
     def chooseVmfDialog_command(self):
@@ -293,6 +344,10 @@ class App:
     def clearConsoleButton_command(self):
         self.consoleTextBox.delete(0.0, tkinter.constants.END)
 
+    def purgeCacheButton_command(self):
+        TextureCache(enabled=False).purge()
+        purgeManifests()
+
     def convertButton_command(self):
         vpkFiles = list(self.vpkList.get(0, self.vpkList.size() - 1))
         gameDirs = list(self.gameDirList.get(0, self.gameDirList.size() - 1))
@@ -347,35 +402,8 @@ class App:
                 return False
 
         start = time.time()
-        vmfName = os.path.splitext(os.path.basename(vmfPath))[0].lower()
         # read the map file and convert everything
-        outputDir += f"/{vmfName}"
-        print(f"Opening VMF file \"{vmfPath}\"...")
-        vmfFile = open(vmfPath)
-        print("Reading VMF file...")
-        BO3 = self.BO3.get()
-        res = exportMap(vmfFile, vpkFiles, gameDirs, BO3, self.removeClips.get(), self.removeProbes.get(), self.removeLights.get(), self.removeSkybox.get(), self.skipMats.get(), self.skipModels.get(), vmfName)
-        # prepare the necessary stuff to move and write files
-        try:
-            makedirs(f"{outputDir}/map_source")
-        except:
-            pass
-        if BO3:
-            try:
-                makedirs(f"{outputDir}/map_source/_prefabs/_{vmfName}")
-            except:
-                pass
-        convertedDir = gettempdir() + "/corvid/converted/"
-        convertedFiles = listdir(convertedDir)
-        print(f"Moving all converted assets to \"{outputDir}\"...")
-        try:
-            for file in convertedFiles:
-                shutil.move(os.path.join(convertedDir, file), outputDir)
-        except:
-            pass
-        # create the .map file
-        print(f"Writing \"{vmfName}.map\" in \"{outputDir}/map_source\"")
-        open(f"{outputDir}/map_source/{vmfName}.map", "w").write(res)
+        convertMap(vmfPath, outputDir, vpkFiles, gameDirs, self.BO3.get(), self.removeClips.get(), self.removeProbes.get(), self.removeLights.get(), self.removeSkybox.get(), self.skipMats.get(), self.skipModels.get(), self.workers.get(), self.textureCache.get(), self.incremental.get())
         end = time.time()
         print(f"Conversion finished in {round(end - start)} seconds")
 
@@ -397,6 +425,8 @@ class TextRedirector(object):
         self.widget.see("end")
 
 if __name__ == "__main__":
+    # needed for the worker processes to start in the frozen executable
+    freeze_support()
     root = tk.Tk()
     app = App(root)
     root.mainloop()
@@ -0,0 +1,93 @@
+# compares the clipped-polygon face builder with the old brute force brush solver, solving a whole map brush
+# by brush with solving it in one batch, and checks that brushes with corners where more than three planes meet
+# come out the same as with the brute force solver no matter how many sides they have, both in a batch and when
+# built with the Brush constructor
+# usage: python -m benchmarks.brushes
+from time import perf_counter
+from modules.Side import Side
+from modules.Brush import Brush
+from modules.BatchSolver import solveBrushes
+from .synthetic import cylinderSides, coneSides, sideData, boxGrid
+
+SIDE_COUNTS = [6, 8, 12, 16, 24, 32, 48, 64]
+MAP_SIZES = [1000, 5000, 20000]
+# side counts on both sides of BatchSolver.BATCH_MAX_SIDES
+DEGENERATE_FACETS = [12, 40]
+
+def solve(sideData, bruteForce=False):
+    sides = [Side(data) for data in sideData]
+    start = perf_counter()
+    if bruteForce:
+        brush = Brush.__new__(Brush)
+        brush.id, brush.sides, brush.hasDisp, brush.entity = "0", sides, False, "world"
+        brush.getIntersectionPointsBruteForce()
+    else:
+        brush = Brush(sides, solve=False)
+        brush.getIntersectionPoints()
+    return brush, perf_counter() - start
+
+def construct(sideData):
+    # the way anything outside of readMap gets a solved brush
+    sides = [Side(data) for data in sideData]
+    start = perf_counter()
+    brush = Brush(sides)
+    return brush, perf_counter() - start
+
+def solveMap(solids, batch=False):
+    brushes = [Brush([Side(data) for data in sides], solve=False) for sides in solids]
+    start = perf_counter()
+    if batch:
+        solveBrushes(brushes)
+    else:
+        for brush in brushes:
+            brush.getIntersectionPoints()
+    return brushes, perf_counter() - start
+
+def degenerateBrushes():
+    # cones, whose facets all meet at the tip, and cylinders with a plane that only touches one of their edges
+    for facets in DEGENERATE_FACETS:
+        yield f"cone {facets + 1} sides", coneSides(facets)
+        edge = cylinderSides(facets)
+        edge.append(sideData(len(edge) + 1, (256.0, 10.0, 0.0), (256.0, -10.0, 0.0), (256.0, -10.0, 128.0)))
+        yield f"touching plane {facets + 3} sides", edge
+
+def main():
+    print(f"{'sides':>6} {'brute force':>12} {'clipped':>10} {'speedup':>8}  output")
+    for count in SIDE_COUNTS:
+        data = cylinderSides(count - 2, origin=(13.5, -7.25, 4.0))
+        old, oldTime = solve(data, True)
+        new, newTime = solve(data)
+        same = all(
+            [str(p) for p in a.points] == [str(p) for p in b.points]
+            for a, b in zip(old.sides, new.sides)
+        )
+        print(f"{count:>6} {oldTime * 1000:>10.2f}ms {newTime * 1000:>8.2f}ms {oldTime / newTime:>7.1f}x  {'identical' if same else 'DIFFERENT'}")
+
+    print()
+    print(f"{'brushes':>8} {'one by one':>11} {'batch':>9} {'speedup':>8}  output")
+    for count in MAP_SIZES:
+        solids = boxGrid(count)
+        # sprinkle some cylinders in, maps are never just boxes
+        solids += [cylinderSides(6 + i % 18, origin=((i % 20) * 600.0, -2000.0 - (i // 20) * 600.0, 0.0)) for i in range(count // 50)]
+        old, oldTime = solveMap(solids)
+        new, newTime = solveMap(solids, True)
+        same = all(
+            [str(p) for p in a.points] == [str(p) for p in b.points]
+            for x, y in zip(old, new) for a, b in zip(x.sides, y.sides)
+        )
+        print(f"{len(solids):>8} {oldTime:>10.2f}s {newTime:>8.2f}s {oldTime / newTime:>7.1f}x  {'identical' if same else 'DIFFERENT'}")
+
+    print()
+    print(f"{'degenerate brush':<24} {'brute force':>12} {'batch':>10} {'Brush()':>10}  output")
+    for name, data in degenerateBrushes():
+        old, oldTime = solve(data, True)
+        new, newTime = solveMap([data], True)
+        built, builtTime = construct(data)
+        same = all(
+            [str(p) for p in a.points] == [str(p) for p in b.points] == [str(p) for p in c.points]
+            for a, b, c in zip(old.sides, new[0].sides, built.sides)
+        )
+        print(f"{name:<24} {oldTime * 1000:>10.2f}ms {newTime * 1000:>8.2f}ms {builtTime * 1000:>8.2f}ms  {'identical' if same else 'DIFFERENT'}")
+
+if __name__ == "__main__":
+    main()
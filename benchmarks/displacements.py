@@ -0,0 +1,157 @@
+# compares parsing displacements into arrays (Side.processDisplacement) and building their meshes with arrays
+# (Displacement.dispMesh) with the Vector3/Vector2 code they replaced
+# usage: python -m benchmarks.displacements [displacements]
+import sys
+import tracemalloc
+from io import StringIO
+from os.path import basename
+from time import perf_counter
+from modules.MapReader import readMap
+from modules.MapExporter import convertDisplacement
+from modules.Side import Side
+from modules.VmfReader import readVmf
+from modules.Vector2 import Vector2
+from modules.Vector3 import Vector3, Vector3ListFromStr
+from modules.VertexTable import VertexTable
+from .synthetic import vmfText
+
+
+def processDisplacementVectors(data):
+    # how Side.processDisplacement used to keep the rows, a Vector3 for every normal and a float for every value
+    result = {"power": int(data["power"]), "elevation": float(data["elevation"]), "row": []}
+    startpos = data["startposition"].replace("[", "").replace("]", "").split(" ")
+    result["startpos"] = Vector3(float(startpos[0]), float(startpos[1]), (startpos[2]))
+    for i in range(int(pow(2, result["power"]) + 1)):
+        result["row"].append({
+            "normals": Vector3ListFromStr(data["normals"]["row" + str(i)]),
+            "distances": [float(val) for val in data["distances"]["row" + str(i)].split(" ")],
+            "alphas": [float(val) for val in data["alphas"]["row" + str(i)].split(" ")]
+        })
+    return result
+
+def parseAll(dispinfos, parse):
+    start = perf_counter()
+    res = [parse(data) for data in dispinfos]
+    elapsed = perf_counter() - start
+    # parsed again to measure what holding the results takes, tracing slows everything down
+    del res
+    tracemalloc.start()
+    res = [parse(data) for data in dispinfos]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return res, elapsed, size
+
+def getDispPoints(p1: Vector3, p2: Vector3, uv1: Vector2, uv2: Vector2, power: int):
+    res = []
+    rowCount = int(2 ** power) + 1
+    for i in range(rowCount):
+        res.append({
+            "pos": p1.lerp(p2, 1 / (rowCount - 1) * i),
+            "uv": uv1.lerp(uv2, 1 / (rowCount - 1) * i)
+        })
+    return res
+
+def convertDisplacementVectors(side, matSize, table: VertexTable):
+    # how convertDisplacement used to build the mesh, a Vector3 and a Vector2 for every step of every vertex
+    points = []
+    for point in side.points:
+        points.append(table.add(point))
+        side.uvs.append(side.getUV(point, matSize[basename(side.material).strip()]))
+    uvs = side.uvs
+    disp = side.dispinfo
+    power = int(disp["power"])
+    numVerts = int(2 ** power) + 1
+    s = 0
+    for i in range(4):
+        if points[i] == disp["startpos"]:
+            s = i
+            break
+    a, b, c, d = points[s], points[(s + 1) % 4], points[(s + 2) % 4], points[(s + 3) % 4]
+    UVa, UVb, UVc, UVd = uvs[s], uvs[(s + 1) % 4], uvs[(s + 2) % 4], uvs[(s + 3) % 4]
+    ab = getDispPoints(a, b, UVa, UVb, power)
+    dc = getDispPoints(d, c, UVd, UVc, power)
+    rows = [getDispPoints(ab[i]["pos"], dc[i]["pos"], ab[i]["uv"], dc[i]["uv"], power) for i in range(len(ab))]
+
+    alpha = False
+    res = [
+        f"// Side {side.id}\n", "{\n", "mesh\n", "{\n", basename(side.material).lower().strip() + "\n", "lightmap_gray\n",
+        str(len(rows[0])) + " " + str(len(rows[0])) + " " + str(side.lightmapScale) + " 8\n"
+    ]
+    for i in range(numVerts):
+        row = rows[i]
+        res.append("(\n")
+        for j in range(numVerts):
+            if disp["row"][j]["alphas"][i] != 0 and alpha != True:
+                alpha = True
+            col = row[j]
+            pos = (col["pos"] + Vector3(0, 0, disp["elevation"]) +
+                   (disp["row"][j]["normals"][i] * disp["row"][j]["distances"][i]))
+            uv = (col["uv"] * side.texSize) * 1
+            lm = col["uv"] * (side.lightmapScale)
+            res.append(f"v {pos} t {uv} {lm}\n")
+        res.append(")\n")
+    res.append("}\n")
+    res.append("}\n")
+
+    if not alpha or basename(side.material).lower().strip() + "_" not in matSize:
+        return "".join(res)
+
+    res += [
+        "{\n", "mesh\n", "{\n", basename(side.material).lower().strip() + "_\n", "lightmap_gray\n",
+        str(len(rows[0])) + " " + str(len(rows[0])) + " " + str(side.lightmapScale) + " 8\n"
+    ]
+    for i in range(numVerts):
+        row = rows[i]
+        res.append("(\n")
+        for j in range(numVerts):
+            col = row[j]
+            pos = (col["pos"] + Vector3(0, 0, disp["elevation"]) +
+                   (disp["row"][j]["normals"][i] * disp["row"][j]["distances"][i]))
+            uv = (col["uv"] * side.texSize) * 1
+            lm = col["uv"] * (side.lightmapScale)
+            if disp["row"][j]["alphas"][i] == 0:
+                res.append(f"v {pos} c 255 255 255 0 t {uv} {lm}\n")
+            else:
+                color = "255 255 255 " + str(disp["row"][j]["alphas"][i])
+                res.append(f"v {pos} c {color} t {uv} {lm}\n")
+        res.append(")\n")
+    res.append("}\n")
+    res.append("}\n")
+    return "".join(res)
+
+def convertAll(sides, dispinfos, matSizes, convert):
+    for side, dispinfo in zip(sides, dispinfos):
+        side.uvs = []
+        side.dispinfo = dispinfo
+    table = VertexTable()
+    start = perf_counter()
+    res = [convert(side, matSizes, table) for side in sides]
+    return res, perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    vmf = vmfText(count, cylinders=0, displacements=count, props=0, lights=0, ropes=0)
+    mapData = readMap(StringIO(vmf))
+    sides = [side for brush in mapData["worldBrushes"] for side in brush.sides if side.hasDisp]
+    # the same displacements as they are in the vmf, in the same order
+    dispinfos = [side.dispinfo for kind, solid in readVmf(vmf) if kind == "solid" for side in solid.sides if "dispinfo" in side]
+    # every material is 512x512, the blend material has a second layer
+    matSizes = {}
+    for mat in mapData["materials"]:
+        matSizes[basename(mat)] = Vector2(512, 512)
+        matSizes[basename(mat) + "_"] = Vector2(512, 512)
+    vertices = sum((2 ** side.dispinfo["power"] + 1) ** 2 for side in sides)
+
+    oldDisps, oldParse, oldSize = parseAll(dispinfos, processDisplacementVectors)
+    newDisps, newParse, newSize = parseAll(dispinfos, lambda data: Side.processDisplacement(None, data))
+    old, oldTime = convertAll(sides, oldDisps, matSizes, convertDisplacementVectors)
+    new, newTime = convertAll(sides, newDisps, matSizes, convertDisplacement)
+    same = "identical" if old == new else "DIFFERENT"
+    print(f"{len(sides)} displacements, {vertices} vertices")
+    print(f"{'':>8} {'vectors':>10} {'arrays':>10} {'speedup':>8}")
+    print(f"{'parse':>8} {oldParse:>9.2f}s {newParse:>9.2f}s {oldParse / newParse:>7.1f}x")
+    print(f"{'memory':>8} {oldSize / 1e6:>8.1f}MB {newSize / 1e6:>8.1f}MB {oldSize / newSize:>7.1f}x")
+    print(f"{'mesh':>8} {oldTime:>9.2f}s {newTime:>9.2f}s {oldTime / newTime:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
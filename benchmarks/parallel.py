@@ -0,0 +1,41 @@
+# how brush solving and .map generation scale with the amount of worker processes
+# usage: python -m benchmarks.parallel [brushes]
+import sys
+from io import StringIO
+from hashlib import md5
+from os.path import basename
+from time import perf_counter
+from modules.MapReader import readMap
+from modules.MapExporter import generateMap
+from modules.Vector2 import Vector2
+from .synthetic import vmfText
+
+WORKERS = [1, 2, 4, 8, 16]
+
+def main():
+    brushes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    vmf = vmfText(brushes, cylinders=brushes // 100, displacements=brushes // 20, props=0, lights=0, ropes=0)
+    print(f"{brushes} brushes")
+    print(f"{'workers':>8} {'solve':>9} {'.map':>9} {'speedup':>8}  output")
+    first, reference = None, None
+    for workers in WORKERS:
+        start = perf_counter()
+        mapData = readMap(StringIO(vmf), workers)
+        solved = perf_counter() - start
+        # every material is 512x512, the blend material has a second layer
+        matSizes = {}
+        for mat in mapData["materials"]:
+            matSizes[basename(mat)] = Vector2(512, 512)
+            matSizes[basename(mat) + "_"] = Vector2(512, 512)
+        start = perf_counter()
+        digest = md5()
+        for chunk in generateMap(mapData, matSizes, workers=workers):
+            digest.update(chunk.encode())
+        generated = perf_counter() - start
+        if first is None:
+            first, reference = solved + generated, digest.hexdigest()
+        same = "identical" if digest.hexdigest() == reference else "DIFFERENT"
+        print(f"{workers:>8} {solved:>8.2f}s {generated:>8.2f}s {first / (solved + generated):>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# shows what caching the planes on Side saves when solving brushes.
+# "uncached" recalculates the normal, distance and center every time they're asked for, like Side used to
+# usage: python -m benchmarks.planes
+# it also checks that the cached planes follow points that are moved in place
+from math import sqrt
+from time import perf_counter
+from modules.Side import Side
+from modules.Brush import Brush
+from modules.Vector3 import Vector3
+from .synthetic import boxSides, cylinderSides
+
+BRUSHES = [("box", 6), ("cylinder", 8), ("cylinder", 16), ("cylinder", 32)]
+
+class UncachedSide(Side):
+    def normal(self):
+        ab: Vector3 = self.p2 - self.p1
+        ac: Vector3 = self.p3 - self.p1
+        return ab.cross(ac)
+
+    def unitNormal(self):
+        return self.normal().normalize()
+
+    def center(self):
+        return (self.p1 + self.p2 + self.p3) / 3
+
+    def distance(self):
+        normal: Vector3 = self.normal()
+        return ((self.p1.x * normal.x) + (self.p1.y * normal.y) + (self.p1.z * normal.z)) / sqrt(pow(normal.x, 2) + pow(normal.y, 2) + pow(normal.z, 2))
+
+allocations = 0
+vectorInit = Vector3.__init__
+
+def countingInit(self, *args):
+    global allocations
+    allocations += 1
+    vectorInit(self, *args)
+
+def measure(sideData, sideType, bruteForce):
+    global allocations
+    sides = [sideType(data) for data in sideData]
+    brush = Brush(sides, solve=False)
+    allocations = 0
+    Vector3.__init__ = countingInit
+    start = perf_counter()
+    if bruteForce:
+        brush.getIntersectionPointsBruteForce()
+    else:
+        brush.getIntersectionPoints()
+    elapsed = perf_counter() - start
+    Vector3.__init__ = vectorInit
+    return elapsed, allocations
+
+def staleSides(sideData):
+    # moves the points of every side in place after its plane was cached, returns the sides whose cached plane
+    # doesn't match the one calculated from scratch
+    stale = 0
+    for data in sideData:
+        side, fresh = Side(data), UncachedSide(data)
+        side.plane()
+        for point in (side.p1, side.p2, side.p3, fresh.p1, fresh.p2, fresh.p3):
+            point += Vector3(16.0, -8.0, 4.5)
+        side.p2.x *= 2
+        fresh.p2.x *= 2
+        if (str(side.normal()), str(side.unitNormal()), side.distance(), str(side.center())) != (
+            str(fresh.normal()), str(fresh.unitNormal()), fresh.distance(), str(fresh.center())
+        ):
+            stale += 1
+    return stale
+
+def main():
+    for solver, bruteForce in (("brute force solver", True), ("clipping solver", False)):
+        print(solver)
+        print(f"{'brush':>12} {'uncached':>24} {'cached':>24} {'time':>6} {'allocs':>7}")
+        for kind, count in BRUSHES:
+            data = boxSides((0, 0, 0), (64, 64, 64)) if kind == "box" else cylinderSides(count - 2)
+            oldTime, oldAllocs = measure(data, UncachedSide, bruteForce)
+            newTime, newAllocs = measure(data, Side, bruteForce)
+            print(
+                f"{f'{kind} {count}':>12} {oldTime * 1000:>9.2f}ms {oldAllocs:>7} vec3 {newTime * 1000:>9.2f}ms {newAllocs:>7} vec3"
+                f" {oldTime / newTime:>5.1f}x {oldAllocs / newAllocs:>6.1f}x"
+            )
+        print()
+
+    data = boxSides((0, 0, 0), (64, 64, 64)) + cylinderSides(30)
+    stale = staleSides(data)
+    print(f"points moved in place: {'planes follow them' if stale == 0 else f'{stale} of {len(data)} planes STALE'}")
+
+if __name__ == "__main__":
+    main()
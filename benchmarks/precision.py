@@ -0,0 +1,68 @@
+# how the precision the mesh vertices are written with changes the size of the .map and the time it takes to write it.
+# every rounded .map is checked against the full precision one: the same lines with every number off by half a
+# unit in the last decimal at most
+# usage: python -m benchmarks.precision [brushes]
+import sys
+from io import StringIO
+from os.path import basename
+from time import perf_counter
+from modules.MapReader import readMap
+from modules.MapExporter import generateMap
+from modules.Vector2 import Vector2
+from .synthetic import vmfText
+
+PRECISIONS = [None, 6, 4, 3, 2]
+
+def vertexValues(line: str):
+    # the numbers of a mesh vertex line, "v x y z [c r g b a] t u v lu lv"
+    return [float(tok) for tok in line.split() if tok not in ("v", "c", "t")]
+
+def compare(reference: str, rounded: str, precision: int):
+    # returns the biggest difference between the numbers of the vertices, None if anything else is different
+    referenceLines, roundedLines = reference.split("\n"), rounded.split("\n")
+    if len(referenceLines) != len(roundedLines):
+        return None
+    worst = 0.0
+    for a, b in zip(referenceLines, roundedLines):
+        if not a.startswith("v "):
+            if a != b:
+                return None
+            continue
+        for x, y in zip(vertexValues(a), vertexValues(b)):
+            worst = max(worst, abs(x - y))
+    return worst
+
+def main():
+    brushes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    mapData = readMap(StringIO(vmfText(brushes, cylinders=brushes // 100, displacements=brushes // 10, props=0, lights=0, ropes=0)))
+    # every material is 512x512, the blend material has a second layer
+    matSizes = {}
+    for mat in mapData["materials"]:
+        matSizes[basename(mat)] = Vector2(512, 512)
+        matSizes[basename(mat) + "_"] = Vector2(512, 512)
+
+    print(f"{'precision':>9} {'time':>8} {'size':>9} {'smaller':>8} {'max error':>10}  output")
+    reference, fullTime = None, None
+    for precision in PRECISIONS:
+        for brush in mapData["worldBrushes"] + mapData["entityBrushes"]:
+            for side in brush.sides:
+                side.uvs = []
+        start = perf_counter()
+        text = "".join(generateMap(mapData, matSizes, precision=precision))
+        elapsed = perf_counter() - start
+        if reference is None:
+            reference, fullTime = text, elapsed
+            print(f"{'full':>9} {elapsed:>7.2f}s {len(text) / 1e6:>7.1f}MB {'':>8} {'':>10}")
+            continue
+        worst = compare(reference, text, precision)
+        if worst is None:
+            result = "DIFFERENT LINES"
+        else:
+            result = "ok" if worst <= 0.5 * 10 ** -precision * (1 + 1e-9) + 1e-12 else "TOO FAR OFF"
+        print(
+            f"{precision:>9} {elapsed:>7.2f}s {len(text) / 1e6:>7.1f}MB {1 - len(text) / len(reference):>7.0%}"
+            f" {worst if worst is not None else float('nan'):>10.2e}  {result} ({fullTime / elapsed:.1f}x)"
+        )
+
+if __name__ == "__main__":
+    main()
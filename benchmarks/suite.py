@@ -0,0 +1,174 @@
+# times every stage of a conversion on a synthetic map and synthetic assets packed into a vpk, and compares the
+# times with a baseline saved earlier on the same machine so regressions show up.
+# usage: python -m benchmarks.suite [--brushes 5000] [--save] [--baseline benchmarks/baseline.json]
+# run it with --save once to record the baseline, then again after a change to compare. exits with 1 if a stage
+# got slower than the tolerance allows
+import sys
+import json
+import argparse
+import platform
+from io import StringIO
+from os.path import exists
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from contextlib import redirect_stdout
+from modules.MapReader import readBrushes, solveMap
+from modules.MapExporter import convertSide, convertDisplacement, generateMap
+from modules.AssetExporter import readMaterials, readTextures, createMaterialGdt
+from modules.AssetConverter import imageJobs, convertAllImages
+from modules.SourceDir import SourceDir
+from modules.Materials import MaterialRegistry
+from modules.VertexTable import VertexTable
+from .synthetic import MATERIALS, vmfText, materialNames, materialTree, packVpk
+
+BASELINE = "benchmarks/baseline.json"
+# stages that take less than this are too noisy to call slower
+MIN_DIFFERENCE = 0.01
+
+
+def resetUvs(mapData):
+    # convertSide and convertDisplacement add to the uvs of the sides, they have to start empty every time
+    for brush in mapData["worldBrushes"] + mapData["entityBrushes"]:
+        for side in brush.sides:
+            side.uvs = []
+
+def geometrySides(mapData):
+    # the sides convertGeometry turns into meshes, split into plain faces and displacements
+    faces, disps = [], []
+    for brush in mapData["worldBrushes"] + mapData["entityBrushes"]:
+        for side in brush.sides:
+            if side.material.startswith("tools") or side.material.startswith("liquids"):
+                continue
+            if side.hasDisp:
+                disps.append(side)
+            elif not brush.hasDisp:
+                faces.append(side)
+    return faces, disps
+
+def runStages(vmf, vpkPath, workDir, workers=1, precision=None):
+    # the time every stage took, in the order they run in a conversion
+    times = {}
+    quiet = StringIO()
+
+    def timed(name, function, *args):
+        start = perf_counter()
+        with redirect_stdout(quiet):
+            res = function(*args)
+        times[name] = perf_counter() - start
+        return res
+
+    mapData = timed("readMap", readBrushes, StringIO(vmf))
+    timed("solve", solveMap, mapData, workers)
+
+    gamePath = SourceDir()
+    gamePath.add(vpkPath)
+    timed("mount", gamePath.buildIndex)
+    registry = MaterialRegistry(gamePath)
+    materials = timed("readMaterials", readMaterials, mapData["materials"], registry)
+    matData = timed("readTextures", readTextures, materials, registry)
+    matSizes = matData["sizes"]
+    timed("createMaterialGdt", createMaterialGdt, matData["vmts"], False)
+    timed("createMaterialGdtBo3", createMaterialGdt, matData["vmts"], True)
+    try:
+        jobs = imageJobs(matData, gamePath, "texture_assets/corvid", "tga", workDir)
+        timed("convertImages", convertAllImages, jobs, None, workers)
+    except Exception as e:
+        # decoding vtfs needs the VTFLib binaries
+        print(f"Skipped convertImages: {e!r}")
+
+    faces, disps = geometrySides(mapData)
+    resetUvs(mapData)
+    table = VertexTable()
+    timed("convertSide", lambda: [convertSide(side, matSizes, table, precision) for side in faces])
+    table = VertexTable()
+    timed("convertDisplacement", lambda: [convertDisplacement(side, matSizes, table, precision) for side in disps])
+    resetUvs(mapData)
+    timed("generateMap", lambda: "".join(generateMap(mapData, matSizes, workers=workers, precision=precision)))
+    return times
+
+def compare(results, baseline, tolerance):
+    # prints the times next to the baseline, returns the stages that got slower
+    slower = []
+    if baseline["settings"] != results["settings"]:
+        print("The baseline was recorded with different settings, the times can't be compared:")
+        print(f"  baseline: {baseline['settings']}")
+        print(f"  now:      {results['settings']}")
+        baseline = {"stages": {}}
+    print(f"{'stage':<22} {'time':>9} {'baseline':>9} {'change':>8}")
+    for name, seconds in results["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            print(f"{name:<22} {seconds:>8.3f}s {'':>9} {'':>8}")
+            continue
+        change = seconds / max(before, 1e-9) - 1
+        flag = ""
+        if change > tolerance and seconds - before > MIN_DIFFERENCE:
+            flag = "  SLOWER"
+            slower.append(name)
+        print(f"{name:<22} {seconds:>8.3f}s {before:>8.3f}s {change:>+8.0%}{flag}")
+    for name in baseline["stages"]:
+        if name not in results["stages"]:
+            print(f"{name:<22} {'skipped':>9} {baseline['stages'][name]:>8.3f}s")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every stage of a conversion on synthetic data")
+    parser.add_argument("--brushes", type=int, default=5000)
+    parser.add_argument("--materials", type=int, default=50, help="materials on top of the few every map uses")
+    parser.add_argument("--props", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--precision", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="every stage keeps its best time out of this many runs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="how much slower a stage can get, 0.15 is 15%%")
+    args = parser.parse_args()
+
+    settings = {
+        "brushes": args.brushes, "materials": args.materials, "props": args.props, "workers": args.workers,
+        "precision": args.precision, "seed": args.seed
+    }
+    workDir = mkdtemp(prefix="corvid_benchmark_")
+    try:
+        start = perf_counter()
+        extra = materialNames(args.materials)
+        vmf = vmfText(
+            args.brushes, cylinders=args.brushes // 100, displacements=args.brushes // 20, props=args.props,
+            lights=args.brushes // 50, ropes=args.brushes // 100, seed=args.seed, materials=extra
+        )
+        files = materialTree(f"{workDir}/game", MATERIALS + extra, args.seed)
+        packVpk(f"{workDir}/game", f"{workDir}/synthetic.vpk")
+        print(f"Generated a {len(vmf) / 1e6:.1f} MB vmf and {files} assets in {perf_counter() - start:.1f}s")
+
+        best = {}
+        for run in range(args.repeat):
+            rmtree(f"{workDir}/converted", ignore_errors=True)
+            for name, seconds in runStages(vmf, f"{workDir}/synthetic.vpk", workDir, args.workers, args.precision).items():
+                best[name] = min(best.get(name, seconds), seconds)
+    finally:
+        rmtree(workDir, ignore_errors=True)
+
+    results = {
+        "settings": settings,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()},
+        "stages": {name: round(seconds, 6) for name, seconds in best.items()}
+    }
+    slower = []
+    if exists(args.baseline):
+        with open(args.baseline) as file:
+            slower = compare(results, json.load(file), args.tolerance)
+    else:
+        compare(results, {"settings": settings, "stages": {}}, args.tolerance)
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved the baseline to \"{args.baseline}\"")
+    elif len(slower) > 0:
+        print(f"{len(slower)} stages got slower: {', '.join(slower)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# generators for synthetic map data, so the benchmarks don't depend on any real (and unshareable) vmf
+from math import cos, sin, pi
+
+def fmt(value: float):
+    # hammer writes whole numbers without a fraction
+    return str(int(value)) if value == int(value) else repr(value)
+
+def planeStr(p1, p2, p3):
+    return " ".join("(" + " ".join(fmt(c) for c in p) + ")" for p in (p1, p2, p3))
+
+def sideData(id, p1, p2, p3, material="dev/dev_measuregeneric01"):
+    return {
+        "id": str(id),
+        "plane": planeStr(p1, p2, p3),
+        "material": material,
+        "uaxis": "[1 0 0 0] 0.25",
+        "vaxis": "[0 -1 0 0] 0.25",
+        "rotation": "0",
+        "lightmapscale": "16",
+        "smoothing_groups": "0"
+    }
+
+def cylinderSides(facets: int, radius=256.0, height=128.0, origin=(0.0, 0.0, 0.0), startId=1):
+    # a prism with the given amount of facets around the z axis plus its two caps.
+    # plane points are ordered the way hammer does, so the normals face into the brush
+    ox, oy, oz = origin
+    top, bottom = oz + height, oz
+    sides = [
+        sideData(startId, (ox, oy, top), (ox + 1, oy, top), (ox + 1, oy - 1, top)),
+        sideData(startId + 1, (ox, oy, bottom), (ox + 1, oy, bottom), (ox + 1, oy + 1, bottom))
+    ]
+    corners = []
+    for i in range(facets):
+        angle = 2 * pi * i / facets
+        corners.append((round(ox + cos(angle) * radius, 3), round(oy + sin(angle) * radius, 3)))
+    for i in range(facets):
+        (ax, ay), (bx, by) = corners[i], corners[(i + 1) % facets]
+        sides.append(sideData(startId + 2 + i, (ax, ay, top), (bx, by, top), (bx, by, bottom)))
+    return sides
+
+def coneSides(facets: int, radius=256.0, height=256.0, origin=(0.0, 0.0, 0.0), startId=1):
+    # a cone with the given amount of facets around the z axis, all of them meet at its tip
+    ox, oy, oz = origin
+    tip = (ox, oy, oz + height)
+    sides = [sideData(startId, (ox, oy, oz), (ox + 1, oy, oz), (ox + 1, oy + 1, oz))]
+    corners = []
+    for i in range(facets):
+        angle = 2 * pi * i / facets
+        corners.append((round(ox + cos(angle) * radius, 3), round(oy + sin(angle) * radius, 3)))
+    for i in range(facets):
+        (ax, ay), (bx, by) = corners[i], corners[(i + 1) % facets]
+        sides.append(sideData(startId + 1 + i, (ax, ay, oz), tip, (bx, by, oz)))
+    return sides
+
+def boxSides(mins, maxs, startId=1):
+    (x1, y1, z1), (x2, y2, z2) = mins, maxs
+    return [
+        sideData(startId, (x1, y2, z2), (x2, y2, z2), (x2, y1, z2)),
+        sideData(startId + 1, (x1, y1, z1), (x2, y1, z1), (x2, y2, z1)),
+        sideData(startId + 2, (x1, y2, z2), (x1, y1, z2), (x1, y1, z1)),
+        sideData(startId + 3, (x2, y2, z1), (x2, y1, z1), (x2, y1, z2)),
+        sideData(startId + 4, (x2, y2, z2), (x1, y2, z2), (x1, y2, z1)),
+        sideData(startId + 5, (x2, y1, z1), (x1, y1, z1), (x1, y1, z2))
+    ]
+
+def boxGrid(count: int, size=64.0, gap=16.0, startId=1):
+    # a flat grid of box brushes, the most common kind of brush there is
+    columns = max(1, int(count ** 0.5))
+    solids = []
+    for i in range(count):
+        x, y = (i % columns) * (size + gap), (i // columns) * (size + gap)
+        solids.append(boxSides((x, y, 0.0), (x + size, y + size, size), startId + i * 6))
+    return solids
+
+def kv(data: dict, depth: int):
+    tabs = "\t" * depth
+    return "".join(f'{tabs}"{key}" "{value}"\n' for key, value in data.items())
+
+def block(name: str, body: str, depth: int):
+    tabs = "\t" * depth
+    return f"{tabs}{name}\n{tabs}{{\n{body}{tabs}}}\n"
+
+def dispInfo(rng, power: int, start):
+    # a displacement with random bumps and blend alphas, its normals point up or lean a bit
+    size = 2 ** power + 1
+    def rows(value):
+        return "".join(f'\t\t\t\t\t"row{i}" "{" ".join(value() for _ in range(size))}"\n' for i in range(size))
+    normals = ["0 0 1", "0 0 1", "0 0 -1", "0.6 0 0.8", "-0.28 0.96 0", "0.123457 -0.492827 0.861289"]
+    return block("dispinfo",
+        kv({"power": power, "startposition": f"[{fmt(start[0])} {fmt(start[1])} {fmt(start[2])}]",
+            "elevation": fmt(rng.choice([0.0, 0.0, 2.5, -1.75])), "subdiv": "0"}, 4)
+        + block("normals", rows(lambda: rng.choice(normals)), 4)
+        + block("distances", rows(lambda: fmt(rng.choice([0.0, 1.5, 8.0, 16.25]))), 4)
+        + block("alphas", rows(lambda: fmt(rng.choice([0.0, 0.0, 255.0, 128.0]))), 4), 3)
+
+def solidText(id, sides: list, disp=""):
+    # disp goes in the first side, which is the top of boxes and cylinders
+    body = kv({"id": id}, 2)
+    for i, side in enumerate(sides):
+        body += block("side", kv(side, 3) + (disp if i == 0 else ""), 2)
+    return block("solid", body, 1)
+
+# the materials every map made by vmfText uses
+MATERIALS = ["concrete/concretefloor001", "brick/brickwall001", "dev/dev_measuregeneric01",
+             "nature/blendgrassdirt", "tools/toolsnodraw", "tools/toolsclip"]
+
+def vmfText(brushes=1000, cylinders=10, displacements=50, props=200, lights=20, ropes=10, seed=1, materials=None):
+    # a whole map: a grid of boxes (some of which have displacements on top), some cylinders,
+    # props, lights, ropes and a brush entity. the faces get random materials out of MATERIALS and materials
+    import random
+    rng = random.Random(seed)
+    materials = MATERIALS + (materials or [])
+    world = kv({"id": "1", "mapversion": "1", "classname": "worldspawn", "skyname": "sky_day01_01"}, 1)
+    sideId = 1
+    solids = boxGrid(brushes)
+    dispEvery = max(1, brushes // displacements) if displacements > 0 else 0
+    for i, sides in enumerate(solids):
+        for side in sides:
+            side["id"] = str(sideId)
+            side["material"] = rng.choice(materials).upper()
+            sideId += 1
+        disp = ""
+        if dispEvery > 0 and i % dispEvery == 0 and i // dispEvery < displacements:
+            sides[0]["material"] = "NATURE/BLENDGRASSDIRT"
+            start = sides[0]["plane"].split(")")[0].strip("( ").split()
+            disp = dispInfo(rng, rng.choice([2, 3, 4]), [float(c) for c in start])
+        world += solidText(i + 2, sides, disp)
+    for i in range(cylinders):
+        sides = cylinderSides(6 + i % 27, origin=((i % 20) * 600.0, -3000.0 - (i // 20) * 600.0, 0.0), startId=sideId)
+        sideId += len(sides)
+        world += solidText(brushes + i + 2, sides)
+
+    text = block("versioninfo", kv({"editorversion": "400", "mapversion": "1"}, 1), 0)
+    text += block("world", world, 0)
+    entityId = brushes + cylinders + 2
+    entities = [{"classname": "light_environment", "_light": "255 255 230 400", "ambient": "150 150 180 100",
+                 "angles": "0 45 0", "pitch": "-45", "origin": "0 0 256"},
+                {"classname": "info_player_terrorist", "origin": "0 0 8", "angles": "0 0 0"},
+                {"classname": "info_player_counterterrorist", "origin": "64 0 8", "angles": "0 180 0"},
+                {"classname": "env_cubemap", "origin": "32 32 32"}]
+    for i in range(props):
+        entities.append({"classname": "prop_static" if i % 4 else "prop_physics_multiplayer",
+                         "model": f"models/props/synthetic/prop{i % 25}.mdl",
+                         "origin": f"{rng.randint(0, 4000)} {rng.randint(0, 4000)} 64", "angles": f"0 {rng.randint(0, 359)} 0"})
+    for i in range(lights):
+        if i % 3:
+            entities.append({"classname": "light", "_light": "255 200 150 300", "origin": f"{i * 64} 0 128"})
+        else:
+            entities.append({"classname": "light_spot", "_light": "255 255 255 200", "origin": f"{i * 64} 64 128",
+                             "angles": "-90 0 0", "pitch": "-90", "_cone": "45", "_inner_cone": "30"})
+    for i in range(ropes):
+        entities.append({"classname": "move_rope", "origin": f"{i * 128} 256 128", "targetname": f"rope{i}",
+                         "NextKey": f"rope{i}_end", "Slack": "25", "Width": "2"})
+        entities.append({"classname": "keyframe_rope", "origin": f"{i * 128 + 96} 256 128", "targetname": f"rope{i}_end",
+                         "Slack": "25", "Width": "2"})
+    for entity in entities:
+        text += block("entity", kv({"id": str(entityId), **entity}, 1), 0)
+        entityId += 1
+
+    body = kv({"id": str(entityId), "classname": "func_detail"}, 1)
+    for i in range(3):
+        sides = boxSides((i * 100.0, -5000.0, 0.0), (i * 100.0 + 50, -4950.0, 50.0), startId=sideId)
+        sideId += 6
+        body += solidText(entityId + i + 1, sides)
+    text += block("entity", body, 0)
+    return text
+
+# materials and textures. the vmts are written as sloppily as real ones often are (comments, tabs, unquoted
+# keys, backslashes and .vtf extensions) since fixVmt has to deal with all of that
+
+BLEND_MATERIAL = "nature/blendgrassdirt"
+
+def vtfBytes(width: int, height: int, seed=0):
+    # an uncompressed rgba8888 vtf 7.2 with a single mipmap, which is as simple as a valid vtf gets
+    import struct
+    header = struct.pack(
+        "<4s2IIHHIHH4x3f4xfIBIBBH", b"VTF\0", 7, 2, 80, width, height, 0, 1, 0,
+        0.5, 0.5, 0.5, 1.0, 0, 1, 0xFFFFFFFF, 0, 0, 1
+    )
+    header += b"\0" * (80 - len(header))
+    # a gradient that's different for every texture, so the images don't compress to nothing
+    row = bytes((x * 4 + seed + channel * 64) % 256 for x in range(width) for channel in range(4))
+    return header + b"".join(row[y % 4 * 4:] + row[:y % 4 * 4] for y in range(height))
+
+def vmtText(material: str, textures: dict, rng):
+    # the vmt of a material and the vtfs it needs, as texture path -> (width, height) in textures
+    name = material.lower()
+    if name.startswith("tools/"):
+        tool = name.split("/")[-1].replace("tools", "")
+        textures[name] = (256, 256)
+        return f'"LightmappedGeneric"\n{{\n\t"$basetexture" "{name}"\n\t"%compile{tool}" 1\n}}\n'
+    size = rng.choice([(256, 256), (512, 512), (512, 256), (1024, 1024)])
+    textures[name] = size
+    lines = [f'\t$basetexture "{name.replace("/", chr(92))}.vtf"', '\t"$surfaceprop" "concrete"']
+    shader = "LightmappedGeneric"
+    if name == BLEND_MATERIAL:
+        shader = "WorldVertexTransition"
+        textures[name + "2"] = size
+        lines.append(f'\t"$basetexture2" "{name}2"')
+        lines.append('\t"$surfaceprop2" "dirt"')
+        if rng.random() < 0.5:
+            textures[name + "_modulate"] = (256, 256)
+            lines.append(f'\t"$blendmodulatetexture" "{name}_modulate"')
+    kind = rng.random()
+    if kind < 0.4:
+        textures[name + "_normal"] = size
+        lines.append(f'\t"$bumpmap" "{name}_normal"')
+        if rng.random() < 0.3:
+            lines.append('\t"$normalmapalphaenvmapmask" 1')
+    elif kind < 0.6:
+        textures[name + "_mask"] = size
+        lines.append(f'\t"$envmapmask"\t"{name}_mask"')
+        lines.append('\t"$envmap" "env_cubemap"')
+    elif kind < 0.7:
+        lines.append('\t"$basealphaenvmapmask" "1"')
+    elif kind < 0.8:
+        lines.append('\t"$translucent" 1')
+    elif kind < 0.85:
+        lines.append('\t"$alphatest" "1"\n\t"$nocull" "1"')
+    return f'// generated\n"{shader}"\n{{\n' + "\n".join(lines) + "\n}\n"
+
+def materialNames(count: int):
+    # extra materials for the maps made by vmfText, on top of the few it always uses
+    return [f"synthetic/material{i:04}" for i in range(count)]
+
+def materialTree(root: str, materials, seed=1):
+    # writes a vmt for every material and the vtfs they use to root/materials, returns the amount of files
+    import random
+    from os import makedirs
+    from os.path import dirname
+    rng = random.Random(seed)
+    textures = {}
+    count = 0
+    for material in materials:
+        vmt = vmtText(material, textures, rng)
+        path = f"{root}/materials/{material.lower()}.vmt"
+        makedirs(dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(vmt)
+        count += 1
+    for i, (texture, (width, height)) in enumerate(textures.items()):
+        path = f"{root}/materials/{texture}.vtf"
+        makedirs(dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(vtfBytes(width, height, i))
+        count += 1
+    return count
+
+def packVpk(root: str, path: str):
+    # packs a folder into a single file vpk
+    import vpk
+    vpk.new(root).save(path)
@@ -0,0 +1,64 @@
+# compares the memory used by the slotted vectors with the old ones that had a __dict__,
+# and the peak memory of solving a synthetic map
+# usage: python -m benchmarks.vectors
+import tracemalloc
+from time import perf_counter
+from modules.Vector3 import Vector3
+from modules.Vector2 import Vector2
+from modules.Side import Side
+from modules.Brush import Brush
+from modules.BatchSolver import solveBrushes
+from .synthetic import boxGrid
+
+COUNT = 1000000
+MAP_SIZE = 5000
+
+class DictVector3:
+    def __init__(self, a=0.0, b=0.0, c=0.0):
+        self.x = float(a) + 0
+        self.y = float(b) + 0
+        self.z = float(c) + 0
+
+class DictVector2:
+    def __init__(self, a=0.0, b=0.0):
+        self.x = float(a)
+        self.y = float(b)
+
+def footprint(create):
+    tracemalloc.start()
+    items = create()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size
+
+def main():
+    print(f"{COUNT} vectors       __dict__      __slots__")
+    for name, old, new in (("Vector3", lambda: [DictVector3(i, i, i) for i in range(COUNT)], lambda: [Vector3(i, i, i) for i in range(COUNT)]),
+                           ("Vector2", lambda: [DictVector2(i, i) for i in range(COUNT)], lambda: [Vector2(i, i) for i in range(COUNT)])):
+        oldSize, newSize = footprint(old), footprint(new)
+        print(f"{name:>15} {oldSize / 2**20:>10.1f}MB {newSize / 2**20:>12.1f}MB  {oldSize / newSize:.1f}x smaller")
+
+    points = [Vector3(i, i * 2, i * 3) for i in range(COUNT)]
+    start = perf_counter()
+    total = Vector3()
+    for point in points:
+        total = total + point
+    outOfPlace = perf_counter() - start
+    start = perf_counter()
+    total = Vector3()
+    for point in points:
+        total += point
+    inPlace = perf_counter() - start
+    print(f"\nsumming {COUNT} vectors: a = a + b {outOfPlace * 1000:.0f}ms, a += b {inPlace * 1000:.0f}ms")
+
+    solids = boxGrid(MAP_SIZE)
+    tracemalloc.start()
+    brushes = [Brush([Side(data) for data in sides], solve=False) for sides in solids]
+    solveBrushes(brushes)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"solving {MAP_SIZE} brushes: {current / 2**20:.1f}MB held, {peak / 2**20:.1f}MB peak")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# compares reading vmts with VmtReader.parseVmt to fixing them up with fixVmt and parsing them with parse_vdf,
+# which is what it replaced. every vmt has to come out the same
+# usage: python -m benchmarks.vmt [vmts]
+import sys
+import random
+from time import perf_counter
+from modules.Static import fixVmt
+from modules.vdfutils import parse_vdf
+from modules.VmtReader import parseVmt
+from .synthetic import vmtText, materialNames
+
+def proxies(rng):
+    # the kind of nested blocks animated and scrolling materials have
+    if rng.random() < 0.5:
+        return '\t"Proxies"\n\t{\n\t\t"AnimatedTexture"\n\t\t{\n\t\t\t"animatedtexturevar" "$basetexture"\n' \
+            '\t\t\t"animatedtextureframenumvar" "$frame"\n\t\t\t"animatedtextureframerate" "10"\n\t\t}\n\t}\n'
+    return '\tProxies\n\t{\n\t\tTextureScroll\n\t\t{\n\t\t\ttexturescrollvar $baseTextureTransform\n' \
+        '\t\t\ttexturescrollrate .05\n\t\t\ttexturescrollangle 90\n\t\t}\n\t}\n'
+
+def vmtCorpus(count: int, seed=1):
+    # vmts written every way they show up in the games: tabs or spaces, quoted or not, comments, uppercase
+    # shaders and keys, windows paths and nested blocks
+    rng = random.Random(seed)
+    res = []
+    for material in materialNames(count):
+        vmt = vmtText(material, {}, rng)
+        if rng.random() < 0.3:
+            vmt = vmt.replace("{\n", "{\n\t$envmaptint \"[ .5 .5 .5 ]\"\n\t\"%keywords\" \"synthetic,concrete\"\n", 1)
+        if rng.random() < 0.3:
+            vmt = vmt[:vmt.rindex("}")] + proxies(rng) + "}\n"
+        if rng.random() < 0.3:
+            vmt = vmt.replace('"$surfaceprop"', "$SurfaceProp").replace("\t", "    ")
+        if rng.random() < 0.3:
+            vmt = vmt.replace("\n", "\r\n")
+        res.append(vmt)
+    return res
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = vmtCorpus(count)
+    size = sum(len(vmt) for vmt in corpus) / 1e6
+    print(f"{count} vmts, {size:.1f} MB")
+
+    start = perf_counter()
+    before = [parse_vdf(fixVmt(vmt)) for vmt in corpus]
+    slow = perf_counter() - start
+    start = perf_counter()
+    after = [parseVmt(vmt) for vmt in corpus]
+    fast = perf_counter() - start
+
+    different = sum(a != b for a, b in zip(before, after))
+    print(f"fixVmt + parse_vdf {slow:>7.3f}s {size / slow:>7.1f} MB/s {count / slow:>9.0f} vmts/s")
+    print(f"parseVmt           {fast:>7.3f}s {size / fast:>7.1f} MB/s {count / fast:>9.0f} vmts/s ({slow / fast:.1f}x)")
+    print("output: " + ("same" if different == 0 else f"{different} DIFFERENT"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# converts maps without the GUI, for build servers and converting lots of maps at once.
+# usage: python cli.py map1.vmf map2.vmf --vpk pak01_dir.vpk --game-dir hl2 --output converted
+import sys
+import argparse
+from time import perf_counter
+from multiprocessing import cpu_count, freeze_support
+from modules.Batch import convertMaps
+from modules.VertexFormat import checkPrecision
+
+
+def readList(path):
+    # one vmf per line, empty lines and lines starting with # are skipped
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip() != "" and not line.strip().startswith("#")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Source Engine maps to Call of Duty")
+    parser.add_argument("vmfs", nargs="*", help="vmf files to convert")
+    parser.add_argument("--list", action="append", default=[], help="text file with a vmf to convert on every line")
+    parser.add_argument("--output", "-o", required=True, help="folder the converted maps are written to, each in a folder of its own")
+    parser.add_argument("--vpk", action="append", default=[], help="vpk to read assets from, can be given more than once")
+    parser.add_argument("--game-dir", action="append", default=[], help="game folder to read assets from, can be given more than once")
+    parser.add_argument("--game", choices=["bo3", "cod"], default="bo3", help="convert for Black Ops 3 or Cod 4/5/7 (default: bo3)")
+    parser.add_argument("--remove-clips", action="store_true")
+    parser.add_argument("--remove-probes", action="store_true")
+    parser.add_argument("--remove-lights", action="store_true")
+    parser.add_argument("--remove-skybox", action="store_true")
+    parser.add_argument("--skip-materials", action="store_true")
+    parser.add_argument("--skip-models", action="store_true")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="how many maps are converted at the same time")
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="processes used by each map (default: every core)")
+    parser.add_argument("--no-texture-cache", action="store_true", help="convert every texture even if it was converted before")
+    parser.add_argument("--incremental", action="store_true", help="reuse what didn't change since the last conversion of a map")
+    parser.add_argument("--precision", type=int, default=None, help="decimals mesh vertices are written with (default: all of them)")
+    parser.add_argument("--profile", action="store_true", help="write how long every stage took to <map>.profile.json next to the .map")
+    parser.add_argument("--profile-memory", action="store_true", help="add the peak memory of every stage to the profile (slower, only with one job)")
+    parser.add_argument("--profile-stage", default=None, help="run cProfile on a stage (like generateMap) and save it next to the profile")
+    args = parser.parse_args()
+
+    vmfs = list(args.vmfs)
+    for path in args.list:
+        vmfs += readList(path)
+    if len(vmfs) == 0:
+        parser.error("no vmf files given")
+    try:
+        checkPrecision(args.precision)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile_memory and args.jobs > 1:
+        # python traces the memory of the whole process, the maps would count towards each other's peaks
+        parser.error("--profile-memory can't be used with more than one job")
+
+    start = perf_counter()
+    results = convertMaps(
+        vmfs, args.output, args.vpk, args.game_dir, args.jobs,
+        BO3=args.game == "bo3",
+        RemoveClips=args.remove_clips,
+        RemoveProbes=args.remove_probes,
+        RemoveLights=args.remove_lights,
+        RemoveSkybox=args.remove_skybox,
+        skipMats=args.skip_materials,
+        skipModels=args.skip_models,
+        workers=args.workers,
+        textureCache=not args.no_texture_cache,
+        incremental=args.incremental,
+        precision=args.precision,
+        profile=args.profile or args.profile_memory,
+        profileMemory=args.profile_memory,
+        profileStage=args.profile_stage
+    )
+    failed = [vmf for vmf, _, error in results if error is not None]
+    print(f"Converted {len(results) - len(failed)} of {len(results)} maps in {perf_counter() - start:.1f} seconds")
+    for vmf in failed:
+        print(f"Failed: {vmf}")
+    return 1 if len(failed) > 0 else 0
+
+if __name__ == "__main__":
+    # needed for the worker processes to start in the frozen executable
+    freeze_support()
+    sys.exit(main())
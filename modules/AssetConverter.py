@@ -1,26 +1,42 @@
 import os
-from os.path import basename, splitext, exists, dirname
+from os.path import basename, splitext
 os.environ["NO_BPY"] = "1"
 from PIL import Image, ImageOps
 from SourceIO.source1.vtf.VTFWrapper import VTFLib
 from .Vector2 import Vector2
 from tempfile import gettempdir
 from .Static import uniqueName
+from .TextureCache import TextureCache
+from .Manifest import Manifest, fileHash
+from .SourceDir import SourceDir, viewAsset, assetBytes, assetSize
 from subprocess import call
+from multiprocessing import Pool
+from time import time
+from struct import unpack_from
 from PyCoD import Model
 
 tempDir = gettempdir() + "/corvid"
+# the signature, version, header size, width and height of a vtf
+VTF_HEADER_SIZE = 20
 
-def convertImage(src, dest, format="rgba", invert=False):
-    if not exists(src):
-        print(f"{src} could not be found")
-        return False
+# every process gets its own instance, see getVtfLib
+vtfLib = None
+# the texture cache of a worker process
+workerCache = None
+
+def getVtfLib():
+    global vtfLib
+    if vtfLib is None:
+        vtfLib = VTFLib.VTFLib()
+    return vtfLib
+
+def initImageWorker(textureCache):
+    global vtfLib, workerCache
+    vtfLib = VTFLib.VTFLib()
+    workerCache = textureCache
+
+def saveImage(rgba: Image.Image, dest, format="rgba", invert=False):
     format = format.upper()
-    image = VTFLib.VTFLib()
-    image.image_load(src)
-    width = image.width()
-    height = image.height()
-    rgba = Image.frombuffer("RGBA", (width, height), image.convert_to_rgba8888().contents)
     if invert:
         rgba = ImageOps.invert(rgba.convert("RGB"))
     if format == "RGBA":
@@ -30,41 +46,133 @@ def convertImage(src, dest, format="rgba", invert=False):
     elif len(format) == 1:
         rgba.getchannel(format).save(dest)
 
-def convertImages(images, src, dest, ext="tga"):
+def convertTexture(src, outputs, cache: TextureCache = None):
+    # writes every (output, format, invert) that comes from the same vtf, which only gets decoded once.
+    # src is where the vtf is in a vpk or game dir (see SourceDir.locate), it's decoded straight from there.
+    # returns the size of the texture, or None if it didn't have to be decoded because everything was cached
+    data = viewAsset(src)
+    if cache is not None:
+        vtfHash = cache.hash(data)
+        keys = [cache.key(vtfHash, splitext(dest)[1][1:].lower(), format.upper(), invert) for dest, format, invert in outputs]
+        outputs = [(output, key) for output, key in zip(outputs, keys) if not cache.get(key, output[0])]
+        if len(outputs) == 0:
+            return None
+    else:
+        outputs = [(output, None) for output in outputs]
+    image = getVtfLib()
+    # VTFLib needs bytes
+    image.image_load_from_buffer(assetBytes(data))
+    width = image.width()
+    height = image.height()
+    rgba = Image.frombuffer("RGBA", (width, height), image.convert_to_rgba8888().contents)
+    for (dest, format, invert), key in outputs:
+        saveImage(rgba, dest, format, invert)
+        if cache is not None:
+            cache.put(key, dest)
+    return Vector2(width, height)
+
+def imageJobs(images, dir: SourceDir, dest, ext="tga", workDir=tempDir):
+    # (vtf location, output, format, invert) of every image that has to be converted
     images["colorMaps"] = list(dict.fromkeys(images["colorMaps"]))
     images["colorMapsAlpha"] = list(dict.fromkeys(images["colorMapsAlpha"]))
     images["normalMaps"] = list(dict.fromkeys(images["normalMaps"]))
     images["envMaps"] = list(dict.fromkeys(images["envMaps"]))
     images["envMapsAlpha"] = list(dict.fromkeys(images["envMapsAlpha"]))
     images["revealMaps"] = list(dict.fromkeys(images["revealMaps"]))
+    jobs = []
+    def addJob(file, output, format, invert=False):
+        location = dir.locate(images["vtfs"][file]) if file in images["vtfs"] else None
+        if location is None:
+            print(f"{file}.vtf could not be found")
+            return
+        jobs.append((location, f"{workDir}/converted/{dest}/{output}.{ext}", format, invert))
     for file in images["colorMapsAlpha"]:
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}.{ext}", "rgba")
+        addJob(file, uniqueName(file), "rgba")
     for file in images["normalMaps"]:
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}.{ext}", "rgb")
+        addJob(file, uniqueName(file), "rgb")
     for file in images["envMaps"]:
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}.{ext}", "rgb")
+        addJob(file, uniqueName(file), "rgb")
     for file in images["envMapsAlpha"]:
-        print(f"Converting {file}")
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}_.{ext}", "a")
+        addJob(file, uniqueName(file) + "_", "a")
     for file in images["revealMaps"]:
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}.{ext}", "g", True)
+        addJob(file, uniqueName(file), "g", True)
     for file in images["colorMaps"]:
-        convertImage(f"{tempDir}/{src}/{file}.vtf", f"{tempDir}/converted/{dest}/{uniqueName(file)}.{ext}", "rgb")
+        addJob(file, uniqueName(file), "rgb")
+    return jobs
+
+def textureJobs(jobs):
+    # groups the image jobs by the vtf they come from.
+    # when more than one job writes the same file, the last one wins like it would if they ran one after the other
+    textures = {}
+    for src, dest, format, invert in {job[1]: job for job in jobs}.values():
+        if src not in textures:
+            textures[src] = []
+        textures[src].append((dest, format, invert))
+    return list(textures.items())
+
+def convertJob(job):
+    # runs in a worker process. the cache counts are sent back since every worker has its own copy
+    src, outputs = job
+    if workerCache is None:
+        convertTexture(src, outputs)
+        return 0, 0
+    hits, misses = workerCache.hits, workerCache.misses
+    convertTexture(src, outputs, workerCache)
+    return workerCache.hits - hits, workerCache.misses - misses
+
+def convertAllImages(jobs, cache: TextureCache = None, workers=1):
+    textures = textureJobs(jobs)
+    # the biggest textures take the longest, starting them first keeps the workers busy until the end
+    textures.sort(key=lambda texture: assetSize(texture[0]), reverse=True)
+    start = time()
+    if workers > 1 and len(textures) > 1:
+        with Pool(workers, initImageWorker, (cache,)) as pool:
+            for hits, misses in pool.imap_unordered(convertJob, textures):
+                if cache is not None:
+                    cache.hits += hits
+                    cache.misses += misses
+    else:
+        for src, outputs in textures:
+            convertTexture(src, outputs, cache)
+    print(f"Converted {len(textures)} textures into {len(jobs)} images in {time() - start:.2f}s")
+
+def convertImages(images, dir: SourceDir, dest, ext="tga", cache: TextureCache = None, workers=1, workDir=tempDir):
+    convertAllImages(imageJobs(images, dir, dest, ext, workDir), cache, workers)
+
+def readVtfSize(header: bytes):
+    # the width and height are two shorts right after the signature, the version and the size of the header.
+    # returns None if it's not a vtf file
+    if header is None or len(header) < VTF_HEADER_SIZE or header[:4] != b"VTF\0":
+        return None
+    width, height = unpack_from("<HH", header, 16)
+    return Vector2(width, height)
 
 def getTexSize(src):
-    image = VTFLib.VTFLib()
+    # only reads the header of the vtf. the whole image is only loaded if that fails
+    with open(src, "rb") as file:
+        size = readVtfSize(file.read(VTF_HEADER_SIZE))
+    if size is not None:
+        return size
+    image = getVtfLib()
     image.image_load(src)
     return Vector2(image.width(), image.height())
 
-def convertModels(models, BO3=False):
+def convertModels(models, BO3=False, manifest: Manifest = None, workDir=tempDir):
     codModel = Model()
-    mdlDir = f"{tempDir}/mdl"
-    convertDir = f"{tempDir}/converted/model_export/corvid"
+    mdlDir = f"{workDir}/mdl"
+    convertDir = f"{workDir}/converted/model_export/corvid"
     for model in models:
         model = splitext(basename(model))[0]
+        if manifest is not None:
+            # models whose files didn't change since the last conversion are copied from the previous one
+            hash = fileHash([f"{mdlDir}/{model}.{ext}" for ext in ["mdl", "dx90.vtx", "vtx", "vvd"]]) + ("_bo3" if BO3 else "")
+            if manifest.loadModel(model, hash, convertDir):
+                continue
         print(f"Converting {model}.mdl...")
         call(["bin/mdl2xmodel.exe", f"{mdlDir}/{model}", convertDir])
         if BO3:
             codModel.LoadFile_Raw(f"{convertDir}/{model}.xmodel_export")
             codModel.WriteFile_Bin(f"{convertDir}/{model}.xmodel_bin")
             os.remove(f"{convertDir}/{model}.xmodel_export")
+        if manifest is not None:
+            manifest.saveModel(hash, [f"{convertDir}/{model}.xmodel_bin" if BO3 else f"{convertDir}/{model}.xmodel_export"])
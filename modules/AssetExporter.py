@@ -1,25 +1,21 @@
 from modules.Vector2 import Vector2
-from modules.vdfutils import parse_vdf
 from os.path import basename, splitext, dirname
-from .Static import fixVmt, uniqueName
+from .Static import uniqueName
+from .Materials import MaterialRegistry
 from .Gdt import Gdt
 from tempfile import gettempdir
-from .AssetConverter import getTexSize
 from SourceIO.source1.mdl.mdl_file import Mdl
 from pathlib import Path
-from .SourceDir import SourceDir
+from .SourceDir import SourceDir, assetBytes
 
 tempDir = f"{gettempdir()}/corvid"
 
-def copyMaterials(mats, dir: SourceDir):
-    res = []
-    for mat in mats:
-        name = basename(mat)
-        dir.copy(f"materials/{mat}.vmt", f"{tempDir}/mat/{name}.vmt")
-        res.append(name)
-    return res
+def readMaterials(mats, registry: MaterialRegistry):
+    # the Material of every material by its name, read straight from the vpks and game dirs. None if it couldn't be found
+    found = registry.load(mats)
+    return {basename(mat): found[mat] for mat in mats}
 
-def copyTextures(mats, dir: SourceDir, mdl=False):
+def readTextures(mats: dict, registry: MaterialRegistry, mdl=False):
     res = {
         "sizes": {}, # save the dimensions of $basetexture
         "colorMaps": [],
@@ -28,26 +24,25 @@ def copyTextures(mats, dir: SourceDir, mdl=False):
         "envMapsAlpha": [],
         "normalMaps": [],
         "revealMaps": [],
-        "vmts": {} # save vmt data to create GDT's later
+        "vtfs": {}, # where each texture is in the vpks or game dirs
+        "vmts": {} # the Material of every vmt that was found, to create GDT's later
     }
-    if not mdl:
-        vmtDir, vtfDir = "mat", "matTex"
-    else:
-        vmtDir, vtfDir = "mdlMats", "mdlTex"
-    for file in mats:
-        name = basename(file)
-        # print(f"Reading {name}.vmt")
-        vmt = parse_vdf(fixVmt(open(f"{tempDir}/{vmtDir}/{name}.vmt").read()))
-        res["vmts"][name] = vmt
-        shader = list(vmt)[0]
-        mat = vmt[shader]
+    for file, material in mats.items():
+        if material is None:
+            # materials that couldn't be found still need a size for the UVs
+            if not mdl:
+                res["sizes"][file.strip()] = Vector2(512, 512)
+            continue
+        res["vmts"][file] = material
+        mat = material.params
+        for texture in material.textures.values():
+            res["vtfs"][splitext(basename(texture))[0]] = f"materials/{texture}.vtf"
         if "$basetexture" in mat:
             baseTexture = mat["$basetexture"].strip()
             name = splitext(basename(baseTexture))[0]
-            dir.copy(f"materials/{baseTexture}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
         if not mdl: # we don't need to get the dimensions of model textures
             if "$basetexture" in mat:
-                res["sizes"][file.strip()] = getTexSize(f"{tempDir}/{vtfDir}/{name}.vtf")
+                res["sizes"][file.strip()] = registry.textureSize(f"materials/{baseTexture}.vtf")
             else:
                 res["sizes"][file.strip()] = Vector2(512, 512)
         if "$basetexture" in mat:
@@ -58,33 +53,27 @@ def copyTextures(mats, dir: SourceDir, mdl=False):
         if "$bumpmap" in mat:
             bumpMap = mat["$bumpmap"].strip()
             name: str = splitext(basename(bumpMap))[0]
-            dir.copy(f"materials/{bumpMap}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["normalMaps"].append(name)
         if "$envmapmask" in mat:
             envMap: str = mat["$envmapmask"].strip()
             name = splitext(basename(envMap))[0]
-            dir.copy(f"materials/{envMap}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["envMaps"].append(name)
         if "$blendmodulatetexture" in mat:
             revealMap: str = mat["$blendmodulatetexture"].strip()
             name = splitext(basename(revealMap))[0]
-            dir.copy(f"materials/{revealMap}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["revealMaps"].append(name)
         if "$basetexture2" in mat:
             basetexture2 = mat["$basetexture2"].strip()
             name: str = splitext(basename(basetexture2))[0]
-            dir.copy(f"materials/{basetexture2}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["colorMaps"].append(name)
-            res["sizes"][file.strip() + "_"] = getTexSize(f"{tempDir}/{vtfDir}/{name}.vtf")
+            res["sizes"][file.strip() + "_"] = registry.textureSize(f"materials/{basetexture2}.vtf")
         if "$bumpmap2" in mat:
             bumpMap2 = mat["$bumpmap2"].strip()
             name: str = splitext(basename(bumpMap2))[0]
-            dir.copy(f"materials/{bumpMap2}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["normalMaps"].append(name)
         if "$envmapmask2" in mat:
             envMap2: str = mat["$envmapmask2"].strip()
             name = splitext(basename(envMap2))[0]
-            dir.copy(f"materials/{envMap2}.vtf", f"{tempDir}/{vtfDir}/{name}.vtf")
             res["envMaps"].append(name)
         if "$basealphaenvmapmask" in mat:
             res["envMapsAlpha"].append(basename(mat["$basetexture"].strip()))
@@ -96,19 +85,26 @@ def copyTextures(mats, dir: SourceDir, mdl=False):
             res["envMapsAlpha"].append(basename(mat["$bumpmap2"].strip()))
     return res
 
-def copyModels(models, dir: SourceDir):
+def copyModels(models, dir: SourceDir, workDir=tempDir):
+    # mdl2xmodel needs the model files on the disk
+    files, optional = [], []
     for model in models:
         name = splitext(basename(model))[0]
         path = dirname(model)
-        dir.copy(f"{model}", f"{tempDir}/mdl/{name}.mdl")
+        files.append((f"{model}", f"{workDir}/mdl/{name}.mdl"))
         for ext in ["dx90.vtx", "vtx", "vvd"]:
-            dir.copy(f"{path}/{name}.{ext}", f"{tempDir}/mdl/{name}.{ext}", True)
+            optional.append((f"{path}/{name}.{ext}", f"{workDir}/mdl/{name}.{ext}"))
+    dir.copyAll(files)
+    dir.copyAll(optional, True)
 
-def copyModelMaterials(models, dir: SourceDir):
-    materials = []
+def readModelMaterials(models, registry: MaterialRegistry):
+    # material -> surface type of the first model that uses it
+    materials = {}
+    mdls = registry.dir.viewAll(models, True)
     for model in models:
-        name = basename(model)
-        mdl = Mdl(f"{tempDir}/mdl/{name}")
+        if model not in mdls:
+            continue
+        mdl = Mdl(assetBytes(mdls[model]))
         mdl.read()
         for material in mdl.materials:
             for path in mdl.materials_paths:
@@ -116,25 +112,20 @@ def copyModelMaterials(models, dir: SourceDir):
                 name = basename(material.name)
                 name = f"{path}/{name}".lower()
                 if name not in materials:
-                    materials.append((name, mdl.header.surface_prop))
+                    materials[name] = mdl.header.surface_prop
 
                 name = Path(material.name).as_posix().lower()
                 if name not in materials:
-                    materials.append((name, mdl.header.surface_prop))
-                    
-    for mat, surface_prop in materials:
-        name = basename(mat)
-        if dir.copy(f"materials/{mat}.vmt", f"{tempDir}/mdlMats/{name}.vmt", True):
+                    materials[name] = mdl.header.surface_prop
+
+    found = registry.load(list(materials), True)
+    res = {}
+    for mat, surface_prop in materials.items():
+        if found[mat] is not None:
             # unlike CoD, the surface type of a model isn't defined in the material so we have to copy that value
             # from the model and paste it in the materials it uses
-            try:
-                file = open(f"{tempDir}/mdlMats/{name}.vmt")
-                new = file.read().replace("{\n", f'{{\n"$surfaceprop" "{surface_prop}" // corvid\n', 1)
-                open(f"{tempDir}/mdlMats/{name}.vmt", "w").write(new)
-            except:
-                pass
-    
-    return [i[0] for i in materials]
+            res[basename(mat)] = found[mat].withParams({"$surfaceprop": surface_prop})
+    return res
 
 def surfaceType(surface):
     surface = surface.lower()
@@ -242,15 +233,16 @@ def surfaceType(surface):
         }
     
 def createMaterialGdt(vmts: dict, BO3=False):
+    # vmts are the Materials by their names, see readTextures
     if BO3:
         return createMaterialGdtBo3(vmts)
     gdt = Gdt()
     textureDir = "texture_assets\\\\corvid\\\\"
     ext, _ext = ".tga", "_.tga"
 
-    for name, vmt in vmts.items():
-        shader = list(vmt)[0]
-        mat = vmt[shader]
+    for name, material in vmts.items():
+        shader = material.shader
+        mat = material.params
         data = {}
         if shader == "lightmappedgeneric" or shader == "worldvertextransition":
             data["materialType"] = "world phong"
@@ -327,9 +319,8 @@ def createMaterialGdt(vmts: dict, BO3=False):
 
 def createMaterialGdtBo3(vmts: dict):
     gdt = Gdt()
-    for name, vmt in vmts.items():
-        shader = list(vmt)[0]
-        mat = vmt[shader]
+    for name, material in vmts.items():
+        mat = material.params
         data = {}
 
         # these are default values and should stay the same unless the material requires more than a color map and a normal map
@@ -0,0 +1,96 @@
+import shutil
+from os import makedirs, listdir
+from os.path import basename, splitext, join
+from tempfile import gettempdir
+from time import perf_counter
+from multiprocessing.pool import ThreadPool
+from .MapExporter import exportMap, mountGame
+from .SourceDir import SourceDir
+from .Profiler import Profiler, stage
+
+# every map converted by convertMaps gets its own folder in here to extract and convert its assets to
+BATCH_DIR = f"{gettempdir()}/corvid_batch"
+
+
+def mapName(vmfPath):
+    return splitext(basename(vmfPath))[0].lower()
+
+def convertMap(vmfPath, outputDir, vpkFiles=[], gameDirs=[], BO3=False, RemoveClips=False, RemoveProbes=False, RemoveLights=False, RemoveSkybox=False, skipMats=False, skipModels=False, workers=1, textureCache=True, incremental=False, precision=None, workDir=None, gamePath: SourceDir = None, profile=False, profileMemory=False, profileStage=None, name=None):
+    # converts a vmf and moves the .map and the converted assets to outputDir/<map name>, which is returned.
+    # the map is named after the vmf unless a name is given.
+    # profile writes how long every stage took to <map name>.profile.json next to the .map, profileMemory adds the peak
+    # memory of every stage and profileStage is the name of a stage to run cProfile on
+    vmfName = name if name is not None else mapName(vmfPath)
+    outputDir += f"/{vmfName}"
+    # prepare the necessary stuff to move and write files
+    makedirs(f"{outputDir}/map_source", exist_ok=True)
+    if BO3:
+        makedirs(f"{outputDir}/map_source/_prefabs/_{vmfName}", exist_ok=True)
+    profiler = Profiler(vmfName, profileMemory, profileStage) if profile or profileStage is not None else None
+    try:
+        print(f"Opening VMF file \"{vmfPath}\"...")
+        with open(vmfPath) as vmfFile:
+            print("Reading VMF file...")
+            # the .map file is written while it's being generated
+            with open(f"{outputDir}/map_source/{vmfName}.map", "w") as mapFile:
+                exportMap(
+                    vmfFile, vpkFiles, gameDirs, BO3, RemoveClips, RemoveProbes, RemoveLights, RemoveSkybox, skipMats, skipModels,
+                    vmfName, mapFile, workers, textureCache, incremental, precision, workDir, gamePath, profiler
+                )
+        print(f"Wrote \"{vmfName}.map\" in \"{outputDir}/map_source\"")
+        convertedDir = f"{workDir if workDir is not None else gettempdir() + '/corvid'}/converted"
+        print(f"Moving all converted assets to \"{outputDir}\"...")
+        with stage(profiler, "moveAssets"):
+            try:
+                for file in listdir(convertedDir):
+                    shutil.move(join(convertedDir, file), outputDir)
+            except:
+                pass
+        if profiler is not None:
+            profiler.save(f"{outputDir}/map_source/{vmfName}.profile.json")
+    finally:
+        if profiler is not None:
+            profiler.close()
+    return outputDir
+
+def convertMaps(vmfPaths, outputDir, vpkFiles=[], gameDirs=[], jobs=1, **options):
+    # converts a bunch of maps with the same settings (options are passed on to convertMap). the game is mounted and
+    # indexed once for all of them and up to jobs maps are converted at the same time, each in its own work folder.
+    # a map that fails doesn't stop the rest. returns (vmf path, seconds, error or None) for every map
+    if options.get("profileMemory", False) and jobs > 1 and len(vmfPaths) > 1:
+        raise ValueError("Memory can only be profiled when the maps are converted one at a time")
+    gamePath = mountGame(vpkFiles, gameDirs)
+
+    # vmfs with the same name from different folders would write to the same output folder and manifest
+    names = []
+    for vmfPath in vmfPaths:
+        name = mapName(vmfPath)
+        count = 1
+        while name in names:
+            count += 1
+            name = f"{mapName(vmfPath)}_{count}"
+        if count > 1:
+            print(f"There's more than one map called \"{mapName(vmfPath)}\", \"{vmfPath}\" is converted as \"{name}\"")
+        names.append(name)
+
+    def convert(job):
+        index, (vmfPath, name) = job
+        workDir = f"{BATCH_DIR}/{index}"
+        start = perf_counter()
+        error = None
+        try:
+            convertMap(vmfPath, outputDir, workDir=workDir, gamePath=gamePath, name=name, **options)
+        except Exception as e:
+            error = e
+            print(f"Could not convert \"{vmfPath}\": {e!r}")
+        finally:
+            shutil.rmtree(workDir, ignore_errors=True)
+        elapsed = perf_counter() - start
+        print(f"{'Failed' if error is not None else 'Finished'} \"{vmfPath}\" in {elapsed:.1f} seconds")
+        return vmfPath, elapsed, error
+
+    try:
+        with ThreadPool(max(1, jobs)) as pool:
+            return pool.map(convert, enumerate(zip(vmfPaths, names)))
+    finally:
+        gamePath.close()
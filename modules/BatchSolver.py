@@ -0,0 +1,162 @@
+import numpy as np
+from itertools import combinations
+from multiprocessing import Pool
+from .Brush import Brush, solverOrder
+from .Vector3 import Vector3
+
+# the amount of plane triples grows with the cube of the side count, so brushes with more sides than this
+# are cheaper to solve with the clipping solver in Brush.getIntersectionPoints. the two only disagree on brushes
+# with corners where more than three planes meet, those are solved with plane triples no matter how many sides
+# they have (see hasSharedCorners)
+BATCH_MAX_SIDES = 28
+# how many point/side legality checks are done at once. keeps the temporary arrays at a few hundred MB at most
+BATCH_CHUNK = 1 << 21
+# smallest amount of brushes worth sending to another process
+PARALLEL_CHUNK = 256
+
+_triples = {}
+
+def getTriples(n: int):
+    # every plane triple of an n sided brush, with the permutations the brute force solver visited them in first and last
+    if n not in _triples:
+        combos = list(combinations(range(n), 3))
+        orders = [solverOrder(a, b, c, n) for a, b, c in combos]
+        _triples[n] = (
+            np.array(combos, dtype=np.intp).reshape(-1, 3),
+            [first for first, _ in orders],
+            np.array([last for _, last in orders], dtype=np.intp).reshape(-1, 3)
+        )
+    return _triples[n]
+
+def planeArrays(brushes: list):
+    # stacks the planes of all the sides of the brushes (which have to have the same amount of sides)
+    planes = [[side.plane() for side in brush.sides] for brush in brushes]
+    unit = np.array([
+        [(p["unitNormal"].x, p["unitNormal"].y, p["unitNormal"].z) for p in sides] for sides in planes
+    ], dtype=np.float64)
+    distance = np.array([[p["distance"] for p in sides] for sides in planes], dtype=np.float64)
+    center = np.array([
+        [(p["center"].x, p["center"].y, p["center"].z) for p in sides] for sides in planes
+    ], dtype=np.float64)
+    return unit, distance, center
+
+def cross(a, b):
+    return np.stack((
+        a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1],
+        a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2],
+        a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+    ), axis=-1)
+
+def intersect(unit, distance, order):
+    # intersects the plane triples of every brush at once. same formula and order of operations as
+    # getPlaneIntersectıon so the results are exactly the same
+    n1, n2, n3 = unit[:, order[:, 0]], unit[:, order[:, 1]], unit[:, order[:, 2]]
+    d1, d2, d3 = distance[:, order[:, 0]], distance[:, order[:, 1]], distance[:, order[:, 2]]
+    determinant = (
+        (n1[..., 0] * n2[..., 1] * n3[..., 2] + n1[..., 1] * n2[..., 2] * n3[..., 0] + n1[..., 2] * n2[..., 0] * n3[..., 1])
+        -
+        (n1[..., 2] * n2[..., 1] * n3[..., 0] + n1[..., 1] * n2[..., 0] * n3[..., 2] + n1[..., 0] * n2[..., 2] * n3[..., 1])
+    )
+    # can't intersect parallel planes
+    valid = ~((determinant <= 0.001) & (determinant >= -0.001)) & ~np.isnan(determinant)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        points = (
+            cross(n2, n3) * d1[..., None] + cross(n3, n1) * d2[..., None] + cross(n1, n2) * d3[..., None]
+        ) / determinant[..., None]
+    return points, valid
+
+def facingDots(points, unit, center):
+    # how much every point faces into every side of its brush, the way Vector3.isLegal measures it
+    facing = points[:, :, None, :] - center[:, None, :, :]
+    length = np.sqrt(facing[..., 0] * facing[..., 0] + facing[..., 1] * facing[..., 1] + facing[..., 2] * facing[..., 2])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        facing = facing / length[..., None]
+    u = unit[:, None, :, :]
+    return facing[..., 0] * u[..., 0] + facing[..., 1] * u[..., 1] + facing[..., 2] * u[..., 2]
+
+def isLegal(points, unit, center):
+    # same test as Vector3.isLegal, for every point against every side of its brush
+    return ~(facingDots(points, unit, center) < -0.001).any(axis=2)
+
+def hasSharedCorners(brush: Brush):
+    # True if a corner of the clipped faces of the brush is on more than three of its planes, as far as the legality
+    # test can tell. plane triples find such a corner once for every triple of those planes and keep the floats of
+    # the last one, and they keep faces that only touch the brush along an edge, which clipping drops
+    points = [(p.x, p.y, p.z) for side in brush.sides for p in side.points]
+    if len(points) == 0:
+        return False
+    unit, _, center = planeArrays([brush])
+    dot = facingDots(np.array([points], dtype=np.float64), unit, center)
+    return bool((~(dot > 0.001)).sum(axis=2).max() > 3)
+
+def solveGroup(brushes: list, n: int):
+    combos, firsts, lasts = getTriples(n)
+    unit, distance, center = planeArrays(brushes)
+    points, valid = intersect(unit, distance, lasts)
+    legal = valid & isLegal(points, unit, center)
+
+    for b in range(len(brushes)):
+        sides = brushes[b].sides
+        found = [[] for _ in range(n)]
+        for t in np.flatnonzero(legal[b]).tolist():
+            x, y, z = points[b, t].tolist()
+            point = Vector3(x, y, z)
+            last = tuple(lasts[t].tolist())
+            for s in combos[t].tolist():
+                found[s].append((firsts[t], point))
+                found[s].append((last, point))
+        for s in range(n):
+            found[s].sort(key=lambda p: p[0])
+            sides[s].points = [p[1] for p in found[s]]
+        brushes[b].sortSides()
+
+def solveChunk(brushes: list):
+    # runs in a worker process, only the points are sent back
+    solveBrushes(brushes)
+    return [[side.points for side in brush.sides] for brush in brushes]
+
+def solveBrushes(brushes: list, workers=1):
+    # solves all the brushes of a map at once. brushes are grouped by their side count so their planes can be
+    # stacked into arrays and all the plane triples get intersected and tested in a handful of numpy calls.
+    # with more than one worker, the brushes are split into chunks that are solved in separate processes.
+    # every brush is solved on its own, so how they're split up doesn't change the results
+    if workers > 1 and len(brushes) > PARALLEL_CHUNK:
+        size = max(PARALLEL_CHUNK, -(-len(brushes) // (workers * 4)))
+        chunks = [brushes[i:i + size] for i in range(0, len(brushes), size)]
+        with Pool(workers) as pool:
+            for chunk, result in zip(chunks, pool.imap(solveChunk, chunks)):
+                for brush, points in zip(chunk, result):
+                    for side, sidePoints in zip(brush.sides, points):
+                        side.points = sidePoints
+                        if side.hasDisp:
+                            brush.hasDisp = True
+        return
+
+    groups = {}
+    shared = []
+    for brush in brushes:
+        n = len(brush.sides)
+        if n < 4:
+            brush.getIntersectionPoints()
+            continue
+        if n > BATCH_MAX_SIDES:
+            try:
+                brush.getIntersectionPoints()
+            except ZeroDivisionError:
+                # a face was clipped away and has no points to sort, plane triples may still find some
+                shared.append(brush)
+                continue
+            if hasSharedCorners(brush):
+                shared.append(brush)
+            continue
+        if n not in groups:
+            groups[n] = []
+        groups[n].append(brush)
+
+    for n, group in groups.items():
+        count = len(getTriples(n)[0])
+        step = max(1, BATCH_CHUNK // (count * n))
+        for i in range(0, len(group), step):
+            solveGroup(group[i:i + step], n)
+    for brush in shared:
+        solveGroup([brush], len(brush.sides))
@@ -1,18 +1,70 @@
+from itertools import permutations
 from .Vector3 import Vector3
 from .Side import Side
 from .Static import getPlaneIntersectıon
+from .Winding import baseWinding, clipWinding
+
+
+def solverOrder(a: int, b: int, c: int, n: int):
+    # the brute force solver visited every permutation of a triple. the first visit decided where the point
+    # went in the face's vertex list and the last one decided its exact floats, which sortVertices depends on.
+    # returns both so the clipped faces come out exactly the same as before
+    visits = [p for p in permutations((a, b, c)) if p[0] < n - 2 and p[1] < n - 1]
+    return min(visits), max(visits)
 
 
 class Brush:
-    def __init__(self, sides: list, entity: str = "world", id="0"):
+    def __init__(self, sides: list, entity: str = "world", id="0", solve=True):
         self.id = id
         self.sides: list[Side] = sides
         self.hasDisp: bool = False
-        # only after all the sides are defined can the intersection points be calculated
-        self.getIntersectionPoints()
+        # hash of the sides in the vmf, only set when converting incrementally (see Manifest)
+        self.hash = None
+        # only after all the sides are defined can the intersection points be calculated.
+        # readMap skips this and solves the brushes of the whole map at once with BatchSolver instead
+        if solve:
+            # imported here since BatchSolver imports this module. it falls back to plane triples for the
+            # degenerate brushes clipping gets wrong, see BatchSolver.hasSharedCorners
+            from .BatchSolver import solveBrushes
+            solveBrushes([self])
         self.entity = entity
 
     def getIntersectionPoints(self):
+        # build the winding of each face by clipping a huge polygon on its plane with every other plane of the brush
+        n = len(self.sides)
+        for i in range(n):
+            winding = baseWinding(self.sides[i].unitNormal(), self.sides[i].distance())
+            for j in range(n):
+                if j == i:
+                    continue
+                winding = clipWinding(winding, self.sides[j].unitNormal(), self.sides[j].distance(), j)
+                if len(winding) < 3:
+                    break
+
+            points = []
+            if len(winding) >= 3:
+                for k in range(len(winding)):
+                    point, edge = winding[k]
+                    prevEdge = winding[k - 1][1]
+                    # every corner of the face is where this plane and the planes of its two edges meet
+                    if edge is None or prevEdge is None or edge == prevEdge:
+                        points.append(((n, n, n), point))
+                        continue
+                    first, last = solverOrder(i, prevEdge, edge, n)
+                    exact = getPlaneIntersectıon(
+                        self.sides[last[0]], self.sides[last[1]], self.sides[last[2]]
+                    )
+                    if exact is None:
+                        exact = point
+                    points.append((first, exact))
+                    points.append((last, exact))
+            points.sort(key=lambda p: p[0])
+            self.sides[i].points = [p[1] for p in points]
+
+        self.sortSides()
+
+    def getIntersectionPointsBruteForce(self):
+        # the old O(n^4) solver, kept around to compare against in benchmarks/brushes.py
         n = len(self.sides)
         for i in range(n - 2):
             for j in range(n - 1):
@@ -26,7 +78,10 @@ class Brush:
                             self.sides[j].points.append(intersectionPoint)
                             self.sides[k].points.append(intersectionPoint)
 
-        for i in range(n):
-            self.sides[i].sortVertices()
-            if self.sides[i].hasDisp:
+        self.sortSides()
+
+    def sortSides(self):
+        for side in self.sides:
+            side.sortVertices()
+            if side.hasDisp:
                 self.hasDisp = True
@@ -0,0 +1,41 @@
+import numpy as np
+from .Vector2 import Vector2
+
+# displacements are built with arrays instead of a Vector3 per vertex. every step does the same floating point
+# operations in the same order as the Vector3/Vector2 math it replaced, so the vertices come out exactly the same.
+# Vector3 adds 0 to everything it's made from (which turns -0.0 into 0.0) and Vector2 doesn't, hence the + 0.0s
+
+
+def lerp(start, end, t):
+    # start.lerp(end, t) for every t, along a new axis before the last one
+    start = start[..., None, :]
+    return start + (end[..., None, :] - start) * t[:, None]
+
+def dispMesh(corners: list, uvs: list, disp: dict, texSize: Vector2, lightmapScale: int):
+    # the vertices of a displacement as (rows, columns, ...) arrays. corners and uvs go around the face
+    # starting at the corner the displacement starts at
+    count = int(2 ** disp["power"]) + 1
+    t = (1 / (count - 1)) * np.arange(count, dtype=np.float64)
+
+    a, b, c, d = (np.array((corner.x, corner.y, corner.z), dtype=np.float64) for corner in corners)
+    ab = lerp(a, b, t) + 0.0
+    dc = lerp(d, c, t) + 0.0
+    pos = lerp(ab, dc, t) + 0.0
+
+    uva, uvb, uvc, uvd = (np.array((uv.x, uv.y), dtype=np.float64) for uv in uvs)
+    uv = lerp(lerp(uva, uvb, t), lerp(uvd, uvc, t), t)
+
+    # the rows of the dispinfo go across the rows of the mesh
+    normals = disp["normals"].transpose(1, 0, 2)
+    distances = disp["distances"].T
+    alphas = disp["alphas"].T
+
+    elevation = np.array((0.0, 0.0, disp["elevation"] + 0.0))
+    pos = pos + elevation + 0.0 + (normals * distances[..., None] + 0.0) + 0.0
+
+    return {
+        "pos": pos,
+        "uv": uv * np.array((texSize.x, texSize.y)),
+        "lm": uv * lightmapScale,
+        "alphas": alphas
+    }
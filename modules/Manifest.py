@@ -0,0 +1,186 @@
+import os
+import marshal
+from os.path import exists, basename, getsize, getmtime
+from hashlib import sha1
+from shutil import copyfile, rmtree
+from .Vector3 import Vector3
+from .Static import userCacheDir
+
+# kept outside of the corvid temp folder since that one gets wiped on every run. marshal can't run code
+# when it's loaded like pickle can
+MANIFEST_DIR = f"{userCacheDir()}/incremental"
+MANIFEST_VERSION = 1
+# the least recently used converted models get removed when they take up more than this
+MODEL_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+
+def hashNamespace(data, hash):
+    # everything in a block of the vmf except the things that change when other parts of the map are edited
+    for key, value in data.items():
+        if key == "_line" or key == "id":
+            continue
+        hash.update(f"{key}\0".encode())
+        if isinstance(value, list):
+            for item in value:
+                hashNamespace(item, hash)
+        elif hasattr(value, "items"):
+            hashNamespace(value, hash)
+        else:
+            hash.update(f"{value}\0".encode())
+        hash.update(b"\1")
+
+def solidHash(solid):
+    hash = sha1()
+    for side in solid.sides:
+        hashNamespace(side, hash)
+        hash.update(b"\2")
+    return hash.hexdigest()
+
+def fileHash(paths):
+    hash = sha1()
+    for path in paths:
+        if exists(path):
+            hash.update(open(path, "rb").read())
+        hash.update(b"\0")
+    return hash.hexdigest()
+
+class Manifest:
+    # what the previous conversion of a map produced, so the next one only has to redo what changed.
+    # brushes are matched by the hash of their sides, so brushes that were moved around in the vmf are still found
+    def __init__(self, mapName, options):
+        if mapName.strip() == "":
+            raise ValueError("Converting incrementally needs the name of the map")
+        self.path = f"{MANIFEST_DIR}/{mapName}.marshal"
+        self.options = options
+        self.previous = {"solids": {}, "points": {}, "chunks": {}, "models": {}}
+        try:
+            with open(self.path, "rb") as file:
+                previous = marshal.load(file)
+            if previous["version"] == MANIFEST_VERSION:
+                self.previous = previous
+                # the .map text of the brushes depends on the export settings, the solved points don't
+                if previous["options"] != options:
+                    self.previous["chunks"] = {}
+        except:
+            pass
+        self.solids = {} # solid id -> hash
+        self.points = {} # hash -> points of every side
+        self.chunks = {} # hash of everything a brush's .map text depends on -> text
+        self.models = {} # model -> hash of its files
+        self.solved = 0
+        self.converted = 0
+
+    def addSolid(self, id, hash):
+        self.solids[id] = hash
+
+    def loadPoints(self, brush):
+        # gives the brush the points it had last time, returns False if it wasn't in the previous map
+        points = self.previous["points"].get(brush.hash)
+        if points is None or len(points) != len(brush.sides):
+            return False
+        for side, sidePoints in zip(brush.sides, points):
+            side.points = [Vector3(x, y, z) for x, y, z in sidePoints]
+            if side.hasDisp:
+                brush.hasDisp = True
+        return True
+
+    def savePoints(self, brush):
+        self.points[brush.hash] = [[(point.x, point.y, point.z) for point in side.points] for side in brush.sides]
+
+    def chunkKey(self, brush, welded, matSizes, world, sky="sky"):
+        # the sky is what skybox faces are turned into, the side ids are written in the comments of the meshes
+        hash = sha1(f"{brush.hash}\0{brush.entity}\0{world}\0{sky}\0".encode())
+        for side in brush.sides:
+            hash.update(f"{side.id}\0".encode())
+        for point in welded:
+            hash.update(f"{point.x} {point.y} {point.z}\0".encode())
+        for side in brush.sides:
+            for name in (basename(side.material).strip(), basename(side.material).strip() + "_"):
+                if name in matSizes:
+                    hash.update(f"{name} {matSizes[name].x} {matSizes[name].y}\0".encode())
+        return hash.hexdigest()
+
+    def loadChunk(self, key):
+        chunk = self.previous["chunks"].get(key)
+        if chunk is not None:
+            self.chunks[key] = chunk
+        return chunk
+
+    def saveChunk(self, key, chunk):
+        self.chunks[key] = chunk
+        self.converted += 1
+
+    def modelDir(self, hash):
+        return f"{MANIFEST_DIR}/models/{hash}"
+
+    def loadModel(self, model, hash, dest):
+        # copies the files converted from the same model files last time to dest, returns False if there aren't any
+        self.models[model] = hash
+        dir = self.modelDir(hash)
+        try:
+            # the modification time of a model's folder is when it was last used, see evict()
+            os.utime(dir)
+            for name in os.listdir(dir):
+                copyfile(f"{dir}/{name}", f"{dest}/{name}")
+        except FileNotFoundError:
+            # never converted, or evicted by another map that's being converted at the same time
+            return False
+        return True
+
+    def saveModel(self, hash, files):
+        files = [path for path in files if exists(path)]
+        if len(files) == 0:
+            return
+        dir = self.modelDir(hash)
+        os.makedirs(dir, exist_ok=True)
+        for path in files:
+            copyfile(path, f"{dir}/{basename(path)}")
+        os.utime(dir)
+
+    def evict(self, maxSize=MODEL_CACHE_SIZE):
+        modelsDir = f"{MANIFEST_DIR}/models"
+        if not exists(modelsDir):
+            return
+        dirs = []
+        for hash in os.listdir(modelsDir):
+            dir = self.modelDir(hash)
+            try:
+                dirs.append((getmtime(dir), sum(getsize(f"{dir}/{name}") for name in os.listdir(dir)), dir))
+            except FileNotFoundError:
+                pass
+        total = sum(size for _, size, _ in dirs)
+        dirs.sort()
+        removed = 0
+        for _, size, dir in dirs:
+            if total <= maxSize:
+                break
+            rmtree(dir, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed > 0:
+            print(f"Removed {removed} models from the incremental cache")
+
+    def report(self):
+        previous = self.previous["solids"]
+        changed = sum(1 for id, hash in self.solids.items() if previous.get(id) != hash)
+        removed = sum(1 for id in previous if id not in self.solids)
+        print(f"{changed} brushes added or changed and {removed} removed since the last conversion")
+        print(f"Solved {self.solved} of {len(self.solids)} brushes, converted {self.converted} of {len(self.chunks)} brushes to .map")
+
+    def save(self):
+        os.makedirs(MANIFEST_DIR, 0o700, exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as file:
+            marshal.dump({
+                "version": MANIFEST_VERSION,
+                "options": self.options,
+                "solids": self.solids,
+                "points": self.points,
+                "chunks": self.chunks,
+                "models": self.models
+            }, file)
+        os.replace(temp, self.path)
+
+def purgeManifests():
+    # forgets every map's previous conversion and the models converted for them
+    rmtree(MANIFEST_DIR, ignore_errors=True)
+    print(f"Purged the incremental cache in \"{MANIFEST_DIR}\"")
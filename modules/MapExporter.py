@@ -1,41 +1,32 @@
 from modules.Brush import Brush
 from modules.SourceDir import SourceDir
 from .Side import Side
-from .MapReader import readMap
+from .MapReader import readMap, mostUsed
 from .Vector2 import Vector2
 from .Vector3 import Vector3, Vector3FromStr
 from .Gdt import Gdt
+from .VertexTable import VertexTable, WeldedVertices
+from .Displacement import dispMesh
+from .VertexFormat import vertexStrings, checkPrecision
 from os.path import basename, splitext
 from os import makedirs
 from tempfile import gettempdir
 from .AssetExporter import *
-from .AssetConverter import convertImages, convertModels
+from .AssetConverter import imageJobs, convertAllImages, convertModels
+from .TextureCache import TextureCache
 from shutil import rmtree
+from multiprocessing import Pool
+from contextlib import nullcontext
+from .Manifest import Manifest
+from .Profiler import Profiler, stage
+from .Materials import MaterialRegistry
 
-class vertexTable:
-    def __init__(self):
-        self.table = {}
-    
-    def add(self, vert: Vector3):
-        index = str(int(vert.len()))
-        if index in self.table:
-            for point in self.table[index]:
-                if point == vert:
-                    return point
-            self.table[index].append(vert)
-            return vert
-        else:
-            self.table[index] = []
-            self.table[index].append(vert)
-            return vert
-
-def convertSide(side: Side, matSize, table: vertexTable):
+def convertSide(side: Side, matSize, table: VertexTable, precision=None):
     # skip invalid sides
     if len(side.points) < 3:
         print(f"Brush face {side.id} has less than 3 vertices. Skipping...")
         return ""
 
-    res = ""
     points = []
     # get uv points
     for point in side.points:
@@ -51,54 +42,36 @@ def convertSide(side: Side, matSize, table: vertexTable):
 
     if side.material.lower().strip().startswith("liquids"):
         side.material = "clip"
-    res += f"// Side {side.id}\n"
-    res += (
-        "{\n" +
-        "mesh\n" +
-        "{\n" +
-        "" + basename(side.material).lower().strip() + "\n" +
-        "lightmap_gray\n" +
-        "" + str(rows) + " 2 " + str(side.lightmapScale) + " 8\n"
+    # the pieces are joined at the end, concatenating big strings over and over is slow
+    res = [
+        f"// Side {side.id}\n",
+        "{\n",
+        "mesh\n",
+        "{\n",
+        basename(side.material).lower().strip() + "\n",
+        "lightmap_gray\n",
+        str(rows) + " 2 " + str(side.lightmapScale) + " 8\n"
+    ]
+
+    texSize, lightmapScale = side.texSize, side.lightmapScale
+    verts = vertexStrings(
+        [(point.x, point.y, point.z) for point in points],
+        [(uv.x * texSize.x, uv.y * texSize.y) for uv in uvs],
+        [(uv.x * lightmapScale, uv.y * lightmapScale) for uv in uvs],
+        precision
     )
-
     for i in range(rows):
-        p1 = {
-            "pos": str(points[i]),
-            "uv": str(uvs[i] * side.texSize),
-            "lm": str(uvs[i] * side.lightmapScale)
-        }
-        p2 = {
-            "pos": str(points[count - i - 1]),
-            "uv": str(uvs[count - i - 1] * side.texSize),
-            "lm": str(uvs[count - i - 1] * side.lightmapScale)
-        }
-        res += (
-            "(\n" +
-            f'v {p1["pos"]} t {p1["uv"]} {p1["lm"]}\n' +
-            f'v {p2["pos"]} t {p2["uv"]} {p2["lm"]}\n' +
-            ")\n"
-        )
-
-    res += (
-        "}\n" +
-        "}\n"
-    )
-    return res
-
+        res.append("(\n")
+        res.append("v %s t %s\n" % verts[i])
+        res.append("v %s t %s\n" % verts[count - i - 1])
+        res.append(")\n")
 
-def getDispPoints(p1: Vector3, p2: Vector3, uv1: Vector2, uv2: Vector2, power: int):
-    res = []
-    rowCount = int(2 ** power) + 1
-    for i in range(rowCount):
-        res.append({
-            "pos": p1.lerp(p2, 1 / (rowCount - 1) * i),
-            "uv": uv1.lerp(uv2, 1 / (rowCount - 1) * i)
-        })
-    return res
+    res.append("}\n")
+    res.append("}\n")
+    return "".join(res)
 
 
-def convertDisplacement(side: Side, matSize, table: vertexTable):
-    res = ""
+def convertDisplacement(side: Side, matSize, table: VertexTable, precision=None):
     points = []
     # get uv points
     for point in side.points:
@@ -112,95 +85,64 @@ def convertDisplacement(side: Side, matSize, table: vertexTable):
         return ""
     uvs: list[Vector2] = side.uvs
     disp: dict = side.dispinfo
-    power: int = int(disp["power"])
-    numVerts: int = int(2 ** power) + 1
     s: int = 0
     for i in range(4):
         if points[i] == disp["startpos"]:
             s = i
             break
 
-    a = points[s]
-    b = points[(s + 1) % 4]
-    c = points[(s + 2) % 4]
-    d = points[(s + 3) % 4]
-
-    UVa = uvs[s]
-    UVb = uvs[(s + 1) % 4]
-    UVc = uvs[(s + 2) % 4]
-    UVd = uvs[(s + 3) % 4]
-
-    ab = getDispPoints(a, b, UVa, UVb, power)
-    dc = getDispPoints(d, c, UVd, UVc, power)
-
-    rows = []
-    for i in range(len(ab)):
-        rows.append(
-            getDispPoints(ab[i]["pos"], dc[i]["pos"], ab[i]["uv"], dc[i]["uv"], power))
-
-    alpha = False
-
-    res += f"// Side {side.id}\n"
-    res += (
-        "{\n" +
-        "mesh\n" +
-        "{\n" +
-        "" + basename(side.material).lower().strip() + "\n" +
-        "lightmap_gray\n"
-        "" + str(len(rows[0])) + " " + str(len(rows[0])
-                                              ) + " " + str(side.lightmapScale) + " 8\n"
-    )
+    order = [(s + i) % 4 for i in range(4)]
+    mesh = dispMesh([points[i] for i in order], [uvs[i] for i in order], disp, side.texSize, side.lightmapScale)
+    numVerts = len(mesh["pos"])
+    # every vertex is written the same way in both meshes, only the blend mesh has colors
+    verts = vertexStrings(mesh["pos"].reshape(-1, 3), mesh["uv"].reshape(-1, 2), mesh["lm"].reshape(-1, 2), precision)
+    header = str(numVerts) + " " + str(numVerts) + " " + str(side.lightmapScale) + " 8\n"
+
+    res = [
+        f"// Side {side.id}\n",
+        "{\n",
+        "mesh\n",
+        "{\n",
+        basename(side.material).lower().strip() + "\n",
+        "lightmap_gray\n",
+        header
+    ]
 
     for i in range(numVerts):
-        row = rows[i]
-        res += "(\n"
-        for j in range(numVerts):
-            if disp["row"][j]["alphas"][i] != 0 and alpha != True:
-                alpha = True
-            col = row[j]
-            pos = (col["pos"] + Vector3(0, 0, disp["elevation"]) +
-                   (disp["row"][j]["normals"][i] * disp["row"][j]["distances"][i]))
-            uv = (col["uv"] * side.texSize) * 1
-            lm = col["uv"] * (side.lightmapScale)
-            res += f"v {pos} t {uv} {lm}\n"
-        res += ")\n"
-    res += ("}\n" +
-            "}\n")
-
-    if not alpha:
-        return res
+        res.append("(\n")
+        for pos, uv in verts[i * numVerts:(i + 1) * numVerts]:
+            res.append(f"v {pos} t {uv}\n")
+        res.append(")\n")
+    res.append("}\n")
+    res.append("}\n")
+
+    if not mesh["alphas"].any():
+        return "".join(res)
     if basename(side.material).lower().strip() + "_" not in matSize:
-        return res
-
-    res += (
-        "{\n" +
-        "mesh\n" +
-        "{\n" +
-        "" + basename(side.material).lower().strip() + "_\n" +
-        "lightmap_gray\n" +
-        "" + str(len(rows[0])) + " " + str(len(rows[0])
-                                              ) + " " + str(side.lightmapScale) + " 8\n"
-    )
-
+        return "".join(res)
+
+    res += [
+        "{\n",
+        "mesh\n",
+        "{\n",
+        basename(side.material).lower().strip() + "_\n",
+        "lightmap_gray\n",
+        header
+    ]
+
+    alphas = mesh["alphas"].tolist()
     for i in range(numVerts):
-        row = rows[i]
-        res += "(\n"
+        res.append("(\n")
         for j in range(numVerts):
-            col = row[j]
-            pos = (col["pos"] + Vector3(0, 0, disp["elevation"]) +
-                   (disp["row"][j]["normals"][i] * disp["row"][j]["distances"][i]))
-            uv = (col["uv"] * side.texSize) * 1
-            lm = col["uv"] * (side.lightmapScale)
-            if disp["row"][j]["alphas"][i] == 0:
-                res += f"v {pos} c 255 255 255 0 t {uv} {lm}\n"
-            else:
-                color = "255 255 255 " + str(disp["row"][j]["alphas"][i])
-                res += f"v {pos} c {color} t {uv} {lm}\n"
-        res += ")\n"
-    res += ("}\n" +
-            "}\n")
+            pos, uv = verts[i * numVerts + j]
+            alpha = alphas[i][j]
+            color = "255 255 255 " + (str(alpha) if alpha != 0 else "0")
+            res.append(f"v {pos} c {color} t {uv}\n")
+        res.append(")\n")
+    res.append("}\n")
+    res.append("}\n")
 
-    return res
+    return "".join(res)
 
 def convertBrush(brush, world=True, RemoveClips=False, RemoveSkybox=False, BO3=False, sky="sky"):
     if RemoveClips:
@@ -239,9 +181,9 @@ def convertBrush(brush, world=True, RemoveClips=False, RemoveSkybox=False, BO3=F
         "toolsskybox": sky
     }
 
-    res = " {\n"
+    res = [" {\n"]
     if not world:
-        res += "  contents detail;\n"
+        res.append("  contents detail;\n")
     else:
         pass  # do nothing. structural brushes and portals don't need to be specified like detail brushes
 
@@ -256,20 +198,20 @@ def convertBrush(brush, world=True, RemoveClips=False, RemoveSkybox=False, BO3=F
                 material = tools[mat]
         else:
             material = "caulk"
-        res += f"  ( {side.p1} ) ( {side.p2} ) ( {side.p3} ) {material} 128 128 0 0 0 0 lightmap_gray 16384 16384 0 0 0 0\n"
+        res.append(f"  ( {side.p1} ) ( {side.p2} ) ( {side.p3} ) {material} 128 128 0 0 0 0 lightmap_gray 16384 16384 0 0 0 0\n")
 
-    res += " }\n"
-    return res
+    res.append(" }\n")
+    return "".join(res)
 
-def convertEntity(entity, id="", geo=""):
-    res = f"// Entity {id}\n" if id != "" else ""
-    res += "{\n"
+def entityHeader(entity, id=""):
+    # an entity without its closing brace, so its brushes can be written right after it
+    res = [f"// Entity {id}\n" if id != "" else "", "{\n"]
     for key, value in entity.items():
-        res += f'"{key}" "{value}"\n'
-    if geo != "":
-        res += geo
-    res += "}\n"
-    return res
+        res.append(f'"{key}" "{value}"\n')
+    return "".join(res)
+
+def convertEntity(entity, id="", geo=""):
+    return entityHeader(entity, id) + geo + "}\n"
 
 def convertLight(entity):
     if "_light" in entity:
@@ -421,16 +363,193 @@ def convertSpawner(entity):
 
     return res
 
-def exportMap(vmfString, vpkFiles=[], gameDirs=[], BO3=False, RemoveClips=False, RemoveProbes=False, RemoveLights=False, RemoveSkybox=False, skipMats=False, skipModels=False, mapName=""):
+def convertGeometry(brushes, matSizes, table: VertexTable, world=True, RemoveClips=False, RemoveSkybox=False, BO3=False, sky="sky", precision=None):
+    for brush in brushes:
+        if not brush.hasDisp:
+            yield convertBrush(brush, world, RemoveClips, RemoveSkybox, BO3, sky)
+        for side in brush.sides:
+            if side.material.startswith("tools") or side.material.startswith("liquids"):
+                continue
+            if side.hasDisp:
+                yield convertDisplacement(side, matSizes, table, precision)
+            if brush.hasDisp:
+                continue
+            yield convertSide(side, matSizes, table, precision)
+
+def weldGeometry(brushes, table: VertexTable):
+    # welds the vertices of the brushes in the same order convertGeometry would, one list per brush
+    res = []
+    for brush in brushes:
+        welded = []
+        for side in brush.sides:
+            if side.material.startswith("tools") or side.material.startswith("liquids"):
+                continue
+            if side.hasDisp:
+                welded += [table.add(point) for point in side.points]
+            if brush.hasDisp:
+                continue
+            # convertSide skips faces with less than 3 vertices before welding anything
+            if len(side.points) >= 3:
+                welded += [table.add(point) for point in side.points]
+        res.append(welded)
+    return res
+
+def convertChunk(args):
+    # runs in a worker process
+    brushes, welded, matSizes, world, RemoveClips, RemoveSkybox, BO3, sky, precision = args
+    table = WeldedVertices([point for points in welded for point in points])
+    return "".join(convertGeometry(brushes, matSizes, table, world, RemoveClips, RemoveSkybox, BO3, sky, precision))
+
+def convertGeometryParallel(brushes, matSizes, table: VertexTable, pool: Pool, chunkSize: int, world=True, RemoveClips=False, RemoveSkybox=False, BO3=False, sky="sky", precision=None):
+    welded = weldGeometry(brushes, table)
+    chunks = (
+        (brushes[i:i + chunkSize], welded[i:i + chunkSize], matSizes, world, RemoveClips, RemoveSkybox, BO3, sky, precision)
+        for i in range(0, len(brushes), chunkSize)
+    )
+    # imap hands the results back in order, so the output is the same no matter how many workers there are
+    yield from pool.imap(convertChunk, chunks)
+
+def convertEachBrush(args):
+    # like convertChunk, but the .map text of every brush is kept separate
+    brushes, welded, matSizes, world, RemoveClips, RemoveSkybox, BO3, sky, precision = args
+    return [
+        "".join(convertGeometry([brush], matSizes, WeldedVertices(points), world, RemoveClips, RemoveSkybox, BO3, sky, precision))
+        for brush, points in zip(brushes, welded)
+    ]
+
+def convertGeometryIncremental(brushes, matSizes, table: VertexTable, manifest: Manifest, pool: Pool, chunkSize: int, world=True, RemoveClips=False, RemoveSkybox=False, BO3=False, sky="sky", precision=None):
+    # reuses the .map text of the brushes that were converted the same way last time. welding is still done for every
+    # brush since an edited brush can change what the ones after it are welded to, that's part of what the text is stored by
+    welded = weldGeometry(brushes, table)
+    keys = [manifest.chunkKey(brush, points, matSizes, world, sky) for brush, points in zip(brushes, welded)]
+    chunks = [manifest.loadChunk(key) for key in keys]
+    missing = [i for i in range(len(brushes)) if chunks[i] is None]
+    jobs = [
+        ([brushes[i] for i in missing[j:j + chunkSize]], [welded[i] for i in missing[j:j + chunkSize]], matSizes, world, RemoveClips, RemoveSkybox, BO3, sky, precision)
+        for j in range(0, len(missing), chunkSize)
+    ]
+    results = pool.imap(convertEachBrush, jobs) if pool is not None else map(convertEachBrush, jobs)
+    converted = (chunk for result in results for chunk in result)
+    for i, chunk in zip(missing, converted):
+        chunks[i] = chunk
+        manifest.saveChunk(keys[i], chunk)
+    yield from chunks
+
+def convertWorldSpawn(entities):
+    # the worldspawn is the first thing in the .map file, so the sun settings have to be found before anything is written
+    settings = {}
+    for entity in entities:
+        if entity["classname"] == "light_environment":
+            # There are better ways to handle these I think. Gotta come back to this eventually.
+            sundirection = Vector3FromStr(entity["angles"])
+            sundirection.x = float(entity["pitch"])
+            sundirection.y -= 180
+            settings = {
+                "sunglight": "1",
+                "sundiffusecolor": "0.75 0.82 0.85",
+                "diffusefraction": ".2",
+                "ambient": ".116",
+                "reflection_ignore_portals": "1",
+                "_color": (Vector3FromStr(entity["ambient"]) / 255).round(3),
+                "suncolor": (Vector3FromStr(entity["_light"]) / 255).round(3),
+                "sundirection": sundirection
+            }
+    return settings
+
+def generateMap(mapData, matSizes, BO3=False, RemoveClips=False, RemoveProbes=False, RemoveLights=False, RemoveSkybox=False, workers=1, manifest: Manifest = None, precision=None):
+    # yields the .map file piece by piece, so it can be written while the rest is still being generated.
+    # with more than one worker, the brushes are split into chunks that are converted in separate processes.
+    # precision is how many decimals the mesh vertices are written with, all of them if it's None
+    checkPrecision(precision)
+    if BO3:
+        yield (
+            "iwmap 4\n"
+            + '"script_startingnumber" 0\n'
+            + '"000_Global" flags expanded  active\n'
+            + '"000_Global/No Comp" flags hidden ignore \n'
+            + '"The Map" flags expanded \n'
+            + entityHeader({
+                "classname": "worldspawn",
+                "lightingquality": "1024",
+                "samplescale": "1",
+                "skyboxmodel": "skybox_default_day",
+                "ssi": "default_day",
+                "wsi": "default_day",
+                "fsi": "default",
+                "gravity": "800",
+                "lodbias": "default",
+                "lutmaterial": "luts_t7_default",
+                "numOmniShadowSlices": "24",
+                "numSpotShadowSlices": "64",
+                "sky_intensity_factor0": "1",
+                "sky_intensity_factor1": "1",
+                "state_alias_1": "State 1",
+                "state_alias_2": "State 2",
+                "state_alias_3": "State 3",
+                "state_alias_4": "State 4"
+            }, id="")
+        )
+    else:
+        yield "iwmap4\n" + entityHeader({**{"classname": "worldspawn"}, **convertWorldSpawn(mapData["entities"])}, id="0")
+
+    table = VertexTable()
+    brushCount = len(mapData["worldBrushes"]) + len(mapData["entityBrushes"])
+    chunkSize = max(64, -(-brushCount // (workers * 4)))
+    if manifest is not None:
+        with Pool(workers) if workers > 1 else nullcontext() as pool:
+            yield from convertGeometryIncremental(mapData["worldBrushes"], matSizes, table, manifest, pool, chunkSize, True, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+            yield from convertGeometryIncremental(mapData["entityBrushes"], matSizes, table, manifest, pool, chunkSize, False, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+    elif workers > 1:
+        with Pool(workers) as pool:
+            yield from convertGeometryParallel(mapData["worldBrushes"], matSizes, table, pool, chunkSize, True, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+            yield from convertGeometryParallel(mapData["entityBrushes"], matSizes, table, pool, chunkSize, False, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+    else:
+        yield from convertGeometry(mapData["worldBrushes"], matSizes, table, True, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+        yield from convertGeometry(mapData["entityBrushes"], matSizes, table, False, RemoveClips, RemoveSkybox, BO3, mapData["sky"], precision)
+    yield "}\n"
+
+    weld = table.stats()
+    print(f"Welded {weld['merges']} vertices into {weld['vertices']} unique ones ({weld['cells']} cells, {weld['averageOccupancy']:.2f} per cell on average, {weld['maxOccupancy']} at most)")
+
+    for entity in mapData["entities"]:
+        if entity["classname"].startswith("prop_"):
+            yield convertProp(entity)
+        elif entity["classname"] == "light" and not RemoveLights:
+            yield convertLight(entity)
+        elif entity["classname"] == "light_spot" and not RemoveLights:
+            yield convertSpotLight(entity, BO3)
+        elif entity["classname"] == "move_rope" or entity["classname"] == "keyframe_rope":
+            yield convertRope(entity)
+        elif entity["classname"] == "env_cubemap" and not RemoveProbes:
+            yield convertCubemap(entity)
+        elif entity["classname"].startswith("info_player") or entity["classname"].endswith("_spawn"):
+            yield convertSpawner(entity)
+
+def mountGame(vpkFiles=[], gameDirs=[]):
+    # the paks and folders where the assets will be grabbed from
+    gamePath = SourceDir()
+    for vpkFile in vpkFiles:
+        print(f"Mounting {vpkFile}...")
+        gamePath.add(vpkFile)
+    for dir in gameDirs:
+        print(f"Mounting {dir}...")
+        gamePath.add(dir)
+    gamePath.cachedIndex()
+    return gamePath
+
+def exportMap(vmfString, vpkFiles=[], gameDirs=[], BO3=False, RemoveClips=False, RemoveProbes=False, RemoveLights=False, RemoveSkybox=False, skipMats=False, skipModels=False, mapName="", output=None, workers=1, textureCache=True, incremental=False, precision=None, workDir=None, gamePath: SourceDir = None, profiler: Profiler = None):
+    # the .map file is returned as a string, or written to output (anything with a write method) as it's being generated.
+    # workers is the amount of processes used to solve and convert the brushes.
+    # incremental reuses whatever didn't change since the last time the map was converted, see Manifest.
+    # precision is how many decimals the mesh vertices are written with, None keeps every digit.
+    # workDir is where the assets are extracted and converted to, maps that are converted at the same time need their own.
+    # gamePath can be a SourceDir that's already mounted and indexed, so it can be shared by many maps.
+    # profiler records how long every stage of the conversion took, see Profiler
     # create temporary directories to extract assets
-    copyDir = gettempdir() + "/corvid"
-    rmtree(copyDir)
+    copyDir = workDir if workDir is not None else gettempdir() + "/corvid"
+    rmtree(copyDir, ignore_errors=True)
     try:
         makedirs(f"{copyDir}/mdl")
-        makedirs(f"{copyDir}/mat")
-        makedirs(f"{copyDir}/mdlMats")
-        makedirs(f"{copyDir}/matTex")
-        makedirs(f"{copyDir}/mdlTex")
         if not BO3:
             makedirs(f"{copyDir}/converted/bin")
         makedirs(f"{copyDir}/converted/model_export/corvid")
@@ -438,174 +557,120 @@ def exportMap(vmfString, vpkFiles=[], gameDirs=[], BO3=False, RemoveClips=False,
         makedirs(f"{copyDir}/converted/texture_assets/corvid")
     except:
         pass
-    mapData = readMap(vmfString)
+    checkPrecision(precision)
+    manifest = Manifest(mapName, (BO3, RemoveClips, RemoveSkybox, precision)) if incremental else None
+    mapData = readMap(vmfString, workers, manifest, profiler)
 
 
     # load &/ define the paks and folders where the assets will be grabbed from
-    gamePath = SourceDir()
-    for vpkFile in vpkFiles:
-        print(f"Mounting {vpkFile}...")
-        gamePath.add(vpkFile)
-    for dir in gameDirs:
-        print(f"Mounting {dir}...")
-        gamePath.add(dir)
-
-    # extract world materials and textures
-    # can't skip exporting these becasue the textures (or the base textures of those materaials) are needed to get the UV of brush faces
+    if gamePath is None:
+        with stage(profiler, "mount"):
+            gamePath = mountGame(vpkFiles, gameDirs)
+
+    # read world materials and textures. they're read straight from the vpks and game dirs, only the converted files are written
+    # can't skip reading these becasue the textures (or the base textures of those materaials) are needed to get the UV of brush faces.
+    # the models share the registry, materials used by both are only read once
+    registry = MaterialRegistry(gamePath)
     print("Reading materials...")
-    materials = copyMaterials(mapData["materials"], gamePath)
+    with stage(profiler, "readMaterials") as record:
+        materials = readMaterials(mapData["materials"], registry)
+        record.add("materials", len(materials))
+        record.add("missing", sum(vmt is None for vmt in materials.values()))
     print("Reading texture data...")
-    matData = copyTextures(materials, gamePath)
+    with stage(profiler, "readTextures") as record:
+        matData = readTextures(materials, registry)
+        record.add("vmts", len(matData["vmts"]))
+        record.add("textures", len(matData["vtfs"]))
     matSizes = matData["sizes"]
 
     # extract models, model materials and textures
     if not skipModels:
         print("Extracting models...")
-        copyModels(mapData["models"], gamePath)
-        mdlMaterials = copyModelMaterials(mapData["models"], gamePath)
-        mdlMatData = copyTextures(mdlMaterials, gamePath, True)
+        with stage(profiler, "extractModels") as record:
+            copyModels(mapData["models"], gamePath, copyDir)
+            record.add("models", len(mapData["models"]))
+        with stage(profiler, "readModelMaterials") as record:
+            reused = registry.reused
+            mdlMaterials = readModelMaterials(mapData["models"], registry)
+            record.add("materials", len(mdlMaterials))
+            record.add("reused", registry.reused - reused)
+        with stage(profiler, "readModelTextures") as record:
+            mdlMatData = readTextures(mdlMaterials, registry, True)
+            record.add("vmts", len(mdlMatData["vmts"]))
+            record.add("textures", len(mdlMatData["vtfs"]))
 
     # create GDT files
     if not skipMats or not skipModels:
         print("Creating GDT files....")
-    if not skipMats:
-        worldMats = createMaterialGdt(matData["vmts"], BO3)
-        open(f"{copyDir}/converted/source_data/_corvid_worldmaterials.gdt", "w").write(worldMats["gdt"])
-    if not BO3 and not skipMats:
-        open(f"{copyDir}/converted/bin/_corvid_worldmaterials.bat", "w").write(worldMats["bat"])
-    if not skipModels:
-        modelMats = createMaterialGdt(mdlMatData["vmts"], BO3)
-        open(f"{copyDir}/converted/source_data/_corvid_modelmaterials.gdt", "w").write(modelMats["gdt"])
-    if not BO3 and not skipModels:
-        open(f"{copyDir}/converted/bin/_corvid_modelmaterials.bat", "w").write(modelMats["bat"])
-    if not skipModels:
-        models = createModelGdt(mapData["models"], BO3)
-        open(f"{copyDir}/converted/source_data/_corvid_models.gdt", "w").write(models["gdt"])
-    if not BO3 and not skipModels:
-        open(f"{copyDir}/converted/bin/_corvid_models.bat", "w").write(models["bat"])
-    # create GDT files for images for Bo3
-    if BO3:
+    with stage(profiler, "gdt"):
         if not skipMats:
-            worldImages = createImageGdt(matData)
-            open(f"{copyDir}/converted/source_data/_corvid_worldimages.gdt", "w").write(worldImages)
+            worldMats = createMaterialGdt(matData["vmts"], BO3)
+            open(f"{copyDir}/converted/source_data/_corvid_worldmaterials.gdt", "w").write(worldMats["gdt"])
+        if not BO3 and not skipMats:
+            open(f"{copyDir}/converted/bin/_corvid_worldmaterials.bat", "w").write(worldMats["bat"])
+        if not skipModels:
+            modelMats = createMaterialGdt(mdlMatData["vmts"], BO3)
+            open(f"{copyDir}/converted/source_data/_corvid_modelmaterials.gdt", "w").write(modelMats["gdt"])
+        if not BO3 and not skipModels:
+            open(f"{copyDir}/converted/bin/_corvid_modelmaterials.bat", "w").write(modelMats["bat"])
         if not skipModels:
-            modelImages = createImageGdt(mdlMatData)
-            open(f"{copyDir}/converted/source_data/_corvid_modelimages.gdt", "w").write(modelImages)
+            models = createModelGdt(mapData["models"], BO3)
+            open(f"{copyDir}/converted/source_data/_corvid_models.gdt", "w").write(models["gdt"])
+        if not BO3 and not skipModels:
+            open(f"{copyDir}/converted/bin/_corvid_models.bat", "w").write(models["bat"])
+        # create GDT files for images for Bo3
+        if BO3:
+            if not skipMats:
+                worldImages = createImageGdt(matData)
+                open(f"{copyDir}/converted/source_data/_corvid_worldimages.gdt", "w").write(worldImages)
+            if not skipModels:
+                modelImages = createImageGdt(mdlMatData)
+                open(f"{copyDir}/converted/source_data/_corvid_modelimages.gdt", "w").write(modelImages)
 
     # convert the textures
     if not skipMats:
         print("Converting textures...")
-        convertImages(matData, "matTex", "texture_assets/corvid", "tif" if BO3 else "tga")
-        if not skipModels:
-            convertImages(mdlMatData, "mdlTex", "texture_assets/corvid", "tif" if BO3 else "tga")
+        with stage(profiler, "convertTextures") as record:
+            # without the cache the vtfs don't have to be hashed at all
+            cache = TextureCache() if textureCache else None
+            # world and model textures are converted together so the workers can be kept busy with both
+            jobs = imageJobs(matData, gamePath, "texture_assets/corvid", "tif" if BO3 else "tga", copyDir)
+            if not skipModels:
+                jobs += imageJobs(mdlMatData, gamePath, "texture_assets/corvid", "tif" if BO3 else "tga", copyDir)
+            convertAllImages(jobs, cache, workers)
+            record.add("images", len(jobs))
+            if cache is not None:
+                cache.report()
+                cache.evict()
+                record.add("cacheHits", cache.hits)
+                record.add("cacheMisses", cache.misses)
+            else:
+                print("Texture cache is disabled")
 
     # convert the models
     if not skipModels:
         print("Converting models...")
-        convertModels(mapData["models"], BO3)
+        # the most used models first, they matter the most if the conversion gets cut short
+        with stage(profiler, "convertModels") as record:
+            convertModels(mostUsed(mapData["modelRefs"]), BO3, manifest, copyDir)
+            record.add("models", len(mapData["modelRefs"]))
     
     # generate map geometry
     print("Generating .map file...")
-    mapGeo = ""
-    mapEnts = ""
-    worldSpawnSettings = ""
-
-    table = vertexTable()
-
-    for brush in mapData["worldBrushes"]:
-        if not brush.hasDisp:
-            mapGeo += convertBrush(brush, True, RemoveClips, RemoveSkybox, BO3, mapData["sky"])
-        for side in brush.sides:
-            if side.material.startswith("tools") or side.material.startswith("liquids"):
-                continue
-            if side.hasDisp:
-                mapGeo += convertDisplacement(side, matSizes, table)
-            if brush.hasDisp:
-                continue
-            mapGeo += convertSide(side, matSizes, table)
-
-    for brush in mapData["entityBrushes"]:
-        if not brush.hasDisp:
-            mapGeo += convertBrush(brush, False, RemoveClips, RemoveSkybox, BO3, mapData["sky"])
-        for side in brush.sides:
-            if side.material.startswith("tools") or side.material.startswith("liquids"):
-                continue
-            if side.hasDisp:
-                mapGeo += convertDisplacement(side, matSizes, table)
-            if brush.hasDisp:
-                continue
-            mapGeo += convertSide(side, matSizes, table)
-
-    for entity in mapData["entities"]:
-        if entity["classname"].startswith("prop_"):
-            mapEnts += convertProp(entity)
-        elif entity["classname"] == "light" and not RemoveLights:
-            mapEnts += convertLight(entity)
-        elif entity["classname"] == "light_spot" and not RemoveLights:
-            mapEnts += convertSpotLight(entity, BO3)
-        elif entity["classname"] == "move_rope" or entity["classname"] == "keyframe_rope":
-            mapEnts += convertRope(entity)
-        elif entity["classname"] == "env_cubemap" and not RemoveProbes:
-            mapEnts += convertCubemap(entity)
-        elif entity["classname"].startswith("info_player") or entity["classname"].endswith("_spawn"):
-            mapEnts += convertSpawner(entity)
-        elif entity["classname"] == "light_environment" and not BO3:
-            # There are better ways to handle these I think. Gotta come back to this eventually.
-            sundirection = Vector3FromStr(entity["angles"])
-            sundirection.x = float(entity["pitch"])
-            sundirection.y -= 180
-            worldSpawnSettings = {
-                "sunglight": "1",
-                "sundiffusecolor": "0.75 0.82 0.85",
-                "diffusefraction": ".2",
-                "ambient": ".116",
-                "reflection_ignore_portals": "1",
-                "_color": (Vector3FromStr(entity["ambient"]) / 255).round(3),
-                "suncolor": (Vector3FromStr(entity["_light"]) / 255).round(3),
-                "sundirection": sundirection
-            }
-    
-    if BO3:
-        res = (
-                "iwmap 4\n"
-                + '"script_startingnumber" 0\n'
-                + '"000_Global" flags expanded  active\n'
-                + '"000_Global/No Comp" flags hidden ignore \n'
-                + '"The Map" flags expanded \n'
-                + convertEntity({
-                    "classname": "worldspawn",
-                    "lightingquality": "1024",
-                    "samplescale": "1",
-                    "skyboxmodel": "skybox_default_day",
-                    "ssi": "default_day",
-                    "wsi": "default_day",
-                    "fsi": "default",
-                    "gravity": "800",
-                    "lodbias": "default",
-                    "lutmaterial": "luts_t7_default",
-                    "numOmniShadowSlices": "24",
-                    "numSpotShadowSlices": "64",
-                    "sky_intensity_factor0": "1",
-                    "sky_intensity_factor1": "1",
-                    "state_alias_1": "State 1",
-                    "state_alias_2": "State 2",
-                    "state_alias_3": "State 3",
-                    "state_alias_4": "State 4"
-                },
-                id="",
-                geo=mapGeo)
-                + mapEnts
-        )
-
-    else:
-        res = (
-            "iwmap4\n"
-            + convertEntity(
-                {**{"classname": "worldspawn"}, **worldSpawnSettings},
-                id="0",
-                geo=mapGeo
-            )
-            + mapEnts
-        )
-
+    with stage(profiler, "generateMap") as record:
+        chunks = generateMap(mapData, matSizes, BO3, RemoveClips, RemoveProbes, RemoveLights, RemoveSkybox, workers, manifest, precision)
+        if output is None:
+            res = "".join(chunks)
+            record.add("bytes", len(res))
+        else:
+            res = None
+            for chunk in chunks:
+                output.write(chunk)
+                record.add("bytes", len(chunk))
+        record.add("brushes", len(mapData["worldBrushes"]) + len(mapData["entityBrushes"]))
+        record.add("entities", len(mapData["entities"]))
+    if manifest is not None:
+        manifest.report()
+        manifest.save()
+        manifest.evict()
     return res
@@ -2,65 +2,110 @@ from pprint import pprint
 from typing import Mapping
 from .Side import Side
 from .Brush import Brush
-from vmf_tool.parser import parse
-def readMap(vmf):
-    mapData = parse(vmf)
+from .BatchSolver import solveBrushes
+from .Manifest import Manifest, solidHash
+from .Profiler import Profiler, stage
+from .VmfReader import readVmf
+
+def addBrush(brushes, sides, entity, solid, manifest: Manifest = None):
+    brush = Brush(sides, entity, solid.id, False)
+    if manifest is not None:
+        brush.hash = solidHash(solid)
+        manifest.addSolid(solid.id, brush.hash)
+    brushes.append(brush)
+
+def addReference(refs: dict, name: str):
+    refs[name] = refs.get(name, 0) + 1
+
+def mostUsed(refs: dict):
+    # names from the most to the least referenced one
+    return sorted(refs, key=lambda name: (-refs[name], name))
+
+def readSolid(brushes, materials, entity, solid, manifest: Manifest = None):
+    sides = []
+    for side in solid.sides:
+        sides.append(Side(side))
+        matName = side.material.lower()
+        if not matName.startswith("tools/") and not matName.startswith("liquids/"):
+            addReference(materials, matName)
+    addBrush(brushes, sides, entity, solid, manifest)
+
+def readMap(vmf, workers=1, manifest: Manifest = None, profiler: Profiler = None):
+    with stage(profiler, "readMap") as record:
+        mapData = readBrushes(vmf, manifest, record)
+        with stage(profiler, "solve") as solveRecord:
+            solveMap(mapData, workers, manifest, solveRecord)
+    return mapData
+
+def solveMap(mapData, workers=1, manifest: Manifest = None, record=None):
+    # the brushes are solved all at once, that's a lot faster than doing it one by one.
+    # when converting incrementally, only the brushes that weren't in the previous version of the map are solved
+    worldBrushes, entityBrushes = mapData["worldBrushes"], mapData["entityBrushes"]
+    brushes = worldBrushes + entityBrushes
+    if manifest is not None:
+        brushes = [brush for brush in brushes if not manifest.loadPoints(brush)]
+        manifest.solved = len(brushes)
+    solveBrushes(brushes, workers)
+    if manifest is not None:
+        for brush in worldBrushes + entityBrushes:
+            manifest.savePoints(brush)
+    if record is not None:
+        record.add("brushes", len(brushes))
+
+def readBrushes(vmf, manifest: Manifest = None, record=None):
+    # builds the brushes and picks the entities out of the vmf, the brushes still have to be solved
     worldBrushes = []
     entityBrushes = []
     entities = []
 
-    materials = []
-    models = []
-
-    for solid in mapData.world.solids:
-        sides = []
-        for side in solid.sides:
-            sides.append(Side(side))
-            matName = side.material.lower()
-            if matName not in materials and not matName.startswith("tools/") and not matName.startswith("liquids/"):
-                materials.append(matName)
-        worldBrushes.append(Brush(sides, "world", solid.id))
-    
+    # how many faces use each material and how many props use each model
+    materials = {}
+    models = {}
+    sky = "sky"
 
-    for entity in mapData.entities:
-        if entity.classname.startswith("prop"):
-            entities.append(entity)
-            if "model" not in entity:
-                continue
-            mdlName = entity.model.lower()
-            if mdlName not in models:
-                models.append(mdlName)
-        elif "solids" in entity:
-            for solid in entity.solids:
-                sides = []
-                for side in solid.sides:
-                    sides.append(Side(side))
-                    matName = side.material.lower()
-                    if matName not in materials and not matName.startswith("tools/") and not matName.startswith("liquids/"):
-                        materials.append(matName)
-                entityBrushes.append(Brush(sides, entity.classname, solid.id))
-        elif "solid" in entity:
-            if isinstance(entity.solid, str):
-                entities.append(entity)
+    # the vmf is read as a stream, every brush is built as soon as its solid has been read
+    stats = {}
+    for kind, block in readVmf(vmf, stats):
+        if kind == "solid":
+            readSolid(worldBrushes, materials, "world", block, manifest)
+        elif kind == "world":
+            if "skyname" in block:
+                sky = block.skyname.lower()
+        elif block.classname.startswith("prop"):
+            entities.append(block)
+            if "model" in block:
+                addReference(models, block.model.lower())
+        elif "solids" in block:
+            for solid in block.solids:
+                readSolid(entityBrushes, materials, block.classname, solid, manifest)
+        elif "solid" in block:
+            if isinstance(block.solid, str):
+                entities.append(block)
             else:
-                sides = []
-                for side in entity.solid.sides:
-                    sides.append(Side(side))
-                    matName = side.material.lower()
-                    if matName not in materials and not matName.startswith("tools/") and not matName.startswith("liquids/"):
-                        materials.append(matName)
-                entityBrushes.append(Brush(sides, entity.classname, solid.id))
+                readSolid(entityBrushes, materials, block.classname, block.solid, manifest)
         else:
-            entities.append(entity)
-    
-    models = sorted(set(models))
-    materials = sorted(set(materials))
+            entities.append(block)
+
+    if record is not None:
+        # the vmf is read in between building the brushes, readVmf keeps track of how long the reading itself took
+        parse = record.child("parseVmf")
+        parse.calls, parse.wall, parse.cpu = 1, stats["wall"], stats["cpu"]
+        parse.add("bytes", stats["bytes"])
+        record.add("brushes", len(worldBrushes) + len(entityBrushes))
+        record.add("sides", sum(len(brush.sides) for brush in worldBrushes + entityBrushes))
+        record.add("entities", len(entities))
+        record.add("materials", len(materials))
+        record.add("models", len(models))
+
+    print(f"Found {len(materials)} materials used by {sum(materials.values())} faces and {len(models)} models used by {sum(models.values())} props")
 
     return {
         "worldBrushes": worldBrushes,
         "entityBrushes": entityBrushes,
         "entities": entities,
-        "materials": materials,
-        "models": models,
-        "sky": mapData.world.skyname.lower() if "skyname" in mapData.world else "sky"
+        "materials": sorted(materials),
+        "models": sorted(models),
+        "materialRefs": materials,
+        "modelRefs": models,
+        "sky": sky
     }
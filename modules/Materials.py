@@ -0,0 +1,113 @@
+from os.path import basename
+from collections import OrderedDict
+from .SourceDir import SourceDir, normalizePath
+from .VmtReader import parseVmt
+from .AssetConverter import readVtfSize, VTF_HEADER_SIZE
+from .Vector2 import Vector2
+
+# material parameters that point to textures we need to convert
+textureParams = [
+    "$basetexture", "$bumpmap", "$envmapmask", "$blendmodulatetexture", "$basetexture2", "$bumpmap2", "$envmapmask2"
+]
+
+
+def readText(view):
+    # same newlines as reading the file in text mode
+    return str(view, "utf-8", "replace").replace("\r\n", "\n").replace("\r", "\n")
+
+def materialPath(path: str):
+    # "Materials\\Concrete/Floor01.vmt" and "concrete/floor01" are the same material
+    path = normalizePath(path)
+    if path.startswith("materials/"):
+        path = path[len("materials/"):]
+    if path.endswith(".vmt"):
+        path = path[:-len(".vmt")]
+    return path
+
+
+class Material:
+    # a parsed vmt: its shader, its parameters (with the keys in lowercase) and the textures they point to
+    def __init__(self, path: str, shader: str, params: dict):
+        self.path = path
+        self.name = basename(path)
+        self.shader = shader
+        self.params = params
+        self.textures = OrderedDict()
+        for param in textureParams:
+            if param in params:
+                self.textures[param] = params[param].strip()
+
+    def withParams(self, params: dict):
+        # a copy of the material with some parameters added. the material's own values win, like they would
+        # if the parameters were written at the top of its vmt
+        return Material(self.path, self.shader, OrderedDict(list(params.items()) + list(self.params.items())))
+
+
+class MaterialRegistry:
+    # every material of a conversion by its path. the world and the models share one, so a material that's used
+    # by both is only read and parsed once. patch materials are resolved to the material they include
+    def __init__(self, dir: SourceDir):
+        self.dir = dir
+        # material path -> Material, or None if it couldn't be found
+        self.materials = {}
+        # vtf path -> size of the texture
+        self.sizes = {}
+        self.parsed = 0
+        self.reused = 0
+
+    def load(self, paths, silent=False):
+        # the Material (or None) of every path, the ones that weren't loaded before are read all at once
+        keys = [materialPath(path) for path in paths]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.materials))
+        self.reused += len(set(keys)) - len(missing)
+        views = self.dir.viewAll([f"materials/{key}.vmt" for key in missing], silent)
+        for key in missing:
+            if key in self.materials:
+                # already loaded as the include of a patch
+                continue
+            view = views.get(f"materials/{key}.vmt")
+            self.materials[key] = self.parse(key, readText(view)) if view is not None else None
+        return {path: self.materials[key] for path, key in zip(paths, keys)}
+
+    def get(self, path, silent=False):
+        # a single material, like the include of a patch. read on this thread, a pool isn't worth it for one file
+        key = materialPath(path)
+        if key in self.materials:
+            self.reused += 1
+            return self.materials[key]
+        view = self.dir.view(f"materials/{key}.vmt", silent)
+        self.materials[key] = self.parse(key, readText(view)) if view is not None else None
+        return self.materials[key]
+
+    def parse(self, key, text):
+        self.parsed += 1
+        vmt = parseVmt(text)
+        shader = list(vmt)[0]
+        params = vmt[shader]
+        if shader != "patch":
+            return Material(key, shader, params)
+
+        # a patch is the material it includes with some parameters inserted or replaced
+        include = params.get("include", "")
+        # a patch that includes itself (or a patch that includes it) is missing until it's done
+        self.materials[key] = None
+        base = self.get(include) if include != "" else None
+        if base is None:
+            print(f"Could not resolve the patch material {key}")
+            return None
+        merged = OrderedDict(base.params)
+        insert, replace = params.get("insert"), params.get("replace")
+        if isinstance(insert, dict):
+            merged.update(insert)
+        if isinstance(replace, dict):
+            for param, value in replace.items():
+                if param in merged:
+                    merged[param] = value
+        return Material(key, base.shader, merged)
+
+    def textureSize(self, path):
+        # reads the size straight from the header of the vtf in the vpk or game dir, so it doesn't have to be extracted first
+        if path not in self.sizes:
+            size = readVtfSize(self.dir.read(path, VTF_HEADER_SIZE))
+            self.sizes[path] = size if size is not None else Vector2(512, 512)
+        return self.sizes[path]
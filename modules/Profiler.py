@@ -0,0 +1,126 @@
+import os
+import json
+import cProfile
+import tracemalloc
+from time import perf_counter, process_time
+from contextlib import contextmanager
+
+
+def cpuTime():
+    # the cpu time of this process and of the worker processes that have finished (those are only known on unix).
+    # it's for the whole process, maps that are converted at the same time count towards each other's time
+    times = os.times()
+    return process_time() + times.children_user + times.children_system
+
+
+class Stage:
+    # what a stage of the conversion took. a stage that's entered more than once (like converting each model) is
+    # recorded once, with the times added up and the amount of calls
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        self.counts = {}
+        self.children = {}
+
+    def add(self, key: str, amount=1):
+        # counts the items the stage went through
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+    def child(self, name: str):
+        if name not in self.children:
+            self.children[name] = Stage(name)
+        return self.children[name]
+
+    def toDict(self, memory: bool):
+        res = {"name": self.name, "calls": self.calls, "wall": round(self.wall, 6), "processCpu": round(self.cpu, 6)}
+        # stages that are timed by someone else (like reading the vmf) don't have a peak of their own
+        if memory and self.peak > 0:
+            res["peakMemory"] = self.peak
+        if len(self.counts) > 0:
+            res["counts"] = self.counts
+        if len(self.children) > 0:
+            res["stages"] = [child.toDict(memory) for child in self.children.values()]
+        return res
+
+
+class Profiler:
+    # records the wall time, cpu time, peak memory and item counts of every stage of a conversion, see stage().
+    # peak memory is what python allocated in this process, it's only traced when memory is True since tracing slows
+    # everything down. tracing is global, so only one map at a time can be profiled with memory.
+    # profileStage is the name of a stage to run cProfile on
+    def __init__(self, name="conversion", memory=False, profileStage=None):
+        self.root = Stage(name)
+        self.stack = [self.root]
+        self.memory = memory
+        self.profileStage = profileStage
+        self.profile = cProfile.Profile() if profileStage is not None else None
+        self.startWall = perf_counter()
+        self.startCpu = cpuTime()
+        self.tracing = memory
+        if memory:
+            if tracemalloc.is_tracing():
+                raise ValueError("Memory is already being traced, only one map at a time can be profiled with memory")
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        record = self.stack[-1].child(name)
+        parent = self.stack[-1]
+        if self.memory:
+            # the peak so far belongs to the parent, the child starts counting from here
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        profiling = self.profile is not None and name == self.profileStage
+        self.stack.append(record)
+        wall, cpu = perf_counter(), cpuTime()
+        if profiling:
+            self.profile.enable()
+        try:
+            yield record
+        finally:
+            if profiling:
+                self.profile.disable()
+            record.calls += 1
+            record.wall += perf_counter() - wall
+            record.cpu += cpuTime() - cpu
+            self.stack.pop()
+            if self.memory:
+                record.peak = max(record.peak, tracemalloc.get_traced_memory()[1])
+                parent.peak = max(parent.peak, record.peak)
+                tracemalloc.reset_peak()
+
+    def finish(self):
+        self.root.calls = 1
+        self.root.wall = perf_counter() - self.startWall
+        self.root.cpu = cpuTime() - self.startCpu
+        if self.memory:
+            self.root.peak = max(self.root.peak, tracemalloc.get_traced_memory()[1])
+
+    def save(self, path):
+        # writes the report as json, and the cProfile stats of the chosen stage next to it
+        self.finish()
+        report = self.root.toDict(self.memory)
+        if self.profile is not None:
+            profilePath = os.path.splitext(path)[0] + ".prof"
+            self.profile.dump_stats(profilePath)
+            report["profile"] = {"stage": self.profileStage, "path": profilePath}
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote the profile of the conversion to \"{path}\"")
+
+    def close(self):
+        if self.tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(profiler: Profiler, name: str):
+    # profiler.stage(name), or nothing if there's no profiler
+    if profiler is None:
+        yield Stage(name)
+    else:
+        with profiler.stage(name) as record:
+            yield record
@@ -1,48 +1,44 @@
-from .Vector3 import Vector3
+from .Vector3 import Vector3, Vector3ListFromStr
 from .Vector2 import Vector2
 from math import pow, sqrt
-import re
 import functools
+import numpy as np
 
 
-def parseTriplets(tri: str):
-    res = []
-    tok = tri.split(" ")
-    i = 0
-    while i < len(tok):
-        res.append(Vector3(tok[i], tok[i + 1], tok[i + 2]))
-        i += 3
-    return res
+def parseRows(rows, count: int, width: int = 1):
+    # all the rows of a displacement field ("row0" to "rowN") at once, as a (rows, columns[, width]) array
+    values = np.fromstring(" ".join(rows["row" + str(i)] for i in range(count)), dtype=np.float64, sep=" ")
+    if values.size != count * count * width:
+        raise ValueError(f"Expected {count * count * width} values in the displacement rows, found {values.size}")
+    return values.reshape((count, count, width) if width > 1 else (count, count))
 
 
-def parseSinglets(sin: str):
-    res = []
-    tok = sin.split(" ")
-    for val in tok:
-        res.append(float(val))
-    return res
+_axisBrackets = str.maketrans("[]", "  ")
+
+def parseAxis(axis: str):
+    # "[x y z offset] scale" -> [x, y, z, offset, scale]
+    return [float(val) for val in axis.translate(_axisBrackets).split()]
 
 
 class Side:
     def __init__(self, data):
         self.id = data["id"]
 
-        p = re.split(r"[(|)| ]", data["plane"])
-
-        self.p1: Vector3 = Vector3(p[1], p[2], p[3])
-        self.p2: Vector3 = Vector3(p[6], p[7], p[8])
-        self.p3: Vector3 = Vector3(p[11], p[12], p[13])
+        self.p1, self.p2, self.p3 = Vector3ListFromStr(data["plane"])
+        # see plane()
+        self._plane = None
+        self._planeKey = None
 
         self.material = data["material"].lower()
 
-        u = re.split(r"[\[|\]| ]", data["uaxis"])
-        v = re.split(r"[\[|\]| ]", data["vaxis"])
-        self.uAxis: Vector3 = Vector3(u[1], u[2], u[3])
-        self.vAxis: Vector3 = Vector3(v[1], v[2], v[3])
-        self.uOffset: float = float(u[4])
-        self.vOffset: float = float(v[4])
-        self.uScale: float = float(u[6])
-        self.vScale: float = float(v[6])
+        u = parseAxis(data["uaxis"])
+        v = parseAxis(data["vaxis"])
+        self.uAxis: Vector3 = Vector3(u[0], u[1], u[2])
+        self.vAxis: Vector3 = Vector3(v[0], v[1], v[2])
+        self.uOffset: float = u[3]
+        self.vOffset: float = v[3]
+        self.uScale: float = u[4]
+        self.vScale: float = v[4]
 
         self.texSize: Vector2 = Vector2(1024, 1024)
         self.lightmapScale: int = int(data["lightmapscale"])
@@ -57,22 +53,41 @@ class Side:
             self.hasDisp = True
             self.dispinfo = self.processDisplacement(data["dispinfo"])
 
+    def plane(self):
+        # the plane of the side is used in the innermost loops of brush solving, so it's calculated once and kept
+        # until the coordinates of the points that define it change. the points are compared by value since the
+        # in-place operators of Vector3 can change them without replacing them
+        p1, p2, p3 = self.p1, self.p2, self.p3
+        key = (p1.x, p1.y, p1.z, p2.x, p2.y, p2.z, p3.x, p3.y, p3.z)
+        if key != self._planeKey:
+            ab: Vector3 = self.p2 - self.p1
+            ac: Vector3 = self.p3 - self.p1
+            normal: Vector3 = ab.cross(ac)
+            self._plane = {
+                "normal": normal,
+                "unitNormal": normal.normalize(),
+                "distance": ((self.p1.x * normal.x) + (self.p1.y * normal.y) + (self.p1.z * normal.z)) / sqrt(pow(normal.x, 2) + pow(normal.y, 2) + pow(normal.z, 2)),
+                "center": (self.p1 + self.p2 + self.p3) / 3
+            }
+            self._planeKey = key
+        return self._plane
+
     def normal(self):
-        ab: Vector3 = self.p2 - self.p1
-        ac: Vector3 = self.p3 - self.p1
-        return ab.cross(ac)
+        return self.plane()["normal"]
+
+    def unitNormal(self):
+        return self.plane()["unitNormal"]
 
     def center(self):
-        return (self.p1 + self.p2 + self.p3) / 3
+        return self.plane()["center"]
 
     def distance(self):
-        normal: Vector3 = self.normal()
-        return ((self.p1.x * normal.x) + (self.p1.y * normal.y) + (self.p1.z * normal.z)) / sqrt(pow(normal.x, 2) + pow(normal.y, 2) + pow(normal.z, 2))
+        return self.plane()["distance"]
 
     def pointCenter(self):
         center = Vector3()
         for point in self.points:
-            center = center + point
+            center += point
         return center / len(self.points)
 
     def sortVertices(self):
@@ -109,18 +124,16 @@ class Side:
         result = {
             "power": int(data["power"]),
             "elevation": float(data["elevation"]),
-            "subdiv": True if data["subdiv"] == "1" else False,
-            "row": []
+            "subdiv": True if data["subdiv"] == "1" else False
         }
         startpos = data["startposition"].replace(
             "[", "").replace("]", "").split(" ")
         result["startpos"] = Vector3(
             float(startpos[0]), float(startpos[1]), (startpos[2]))
 
-        for i in range(int(pow(2, result["power"]) + 1)):
-            result["row"].append({
-                "normals": parseTriplets(data["normals"]["row" + str(i)]),
-                "distances": parseSinglets(data["distances"]["row" + str(i)]),
-                "alphas": parseSinglets(data["alphas"]["row" + str(i)])
-            })
+        # indexed [row][column] like in the vmf, they're kept as arrays because terrain can have a lot of them
+        count = int(pow(2, result["power"]) + 1)
+        result["normals"] = parseRows(data["normals"], count, 3) + 0.0
+        result["distances"] = parseRows(data["distances"], count)
+        result["alphas"] = parseRows(data["alphas"], count)
         return result
@@ -6,7 +6,7 @@ def parseSmd(smd):
     frame = 0
     triangles = [] * 4096
     tri = -1
-    materials = []
+    materials = {}
     NONE, NODES, SKELETON , TRIANGLES, VERTEXANIMATION = 0, 1, 2, 3, 4
     current = NONE
 
@@ -83,8 +83,7 @@ def parseSmd(smd):
                     "material": line,
                     "vertices": []
                 })
-                if line not in materials:
-                    materials.append(line)
+                materials[line] = None
             else:
                 # parentJoint posX posY posZ normX normY normZ U V numJoints [jointId weight...
                 numJoints = int(tok[9])
@@ -108,5 +107,5 @@ def parseSmd(smd):
         "joints": joints,
         "frames": frames,
         "triangles": triangles,
-        "materials": materials
+        "materials": list(materials)
     }
@@ -1,41 +1,340 @@
 import vpk
-from os.path import isdir, isfile, basename
+import marshal
+from os import cpu_count, walk, makedirs
+from os.path import isdir, isfile, dirname, getsize, getmtime, relpath
 from shutil import copyfile
 from pathlib import Path
+from threading import local, Lock, current_thread
+from multiprocessing.pool import ThreadPool
+from time import perf_counter
+from mmap import mmap, ACCESS_READ
+from .Static import userCacheDir
+
+# extraction is mostly waiting on the disk, so there can be more threads than cores
+EXTRACT_THREADS = min(32, (cpu_count() or 1) + 4)
+# only these folders of game directories are indexed, nothing else is ever extracted from them
+INDEXED_FOLDERS = ["materials", "models"]
+INDEX_VERSION = 1
+# kept outside of the corvid temp folder since that one gets wiped on every run. marshal can't run code
+# when it's loaded like pickle can
+INDEX_FILE = f"{userCacheDir()}/index.marshal"
+
+# memory maps of vpk archives, shared by all the threads of a process
+archiveMaps = {}
+archiveLock = Lock()
+
+def mapArchive(path):
+    with archiveLock:
+        if path not in archiveMaps:
+            with open(path, "rb") as file:
+                archiveMaps[path] = mmap(file.fileno(), 0, access=ACCESS_READ)
+        return archiveMaps[path]
+
+def viewAsset(location):
+    # contents of an asset from where SourceDir.locate found it. files stored whole in a vpk archive are sliced
+    # out of a memory map of the archive without being copied, loose files are read and files with preload bytes
+    # are joined to them, which copies them once. locations can be sent to other processes
+    path, offset, length, preload = location
+    if preload is None:
+        with open(path, "rb") as file:
+            return memoryview(file.read())
+    if length == 0:
+        return memoryview(preload)
+    view = memoryview(mapArchive(path))[offset:offset + length]
+    if len(preload) > 0:
+        return memoryview(preload + view)
+    return view
+
+def assetBytes(view: memoryview):
+    # the asset as bytes for readers that can't take a view. views of bytes that were already read or joined
+    # give back those bytes instead of copying them again, only mmap slices are copied
+    if isinstance(view.obj, bytes) and len(view.obj) == view.nbytes:
+        return view.obj
+    return bytes(view)
+
+def assetSize(location):
+    path, _, length, preload = location
+    if preload is None:
+        return getsize(path)
+    return len(preload) + length
+
+def normalizePath(path):
+    # source doesn't care about the case or the direction of slashes in asset paths
+    return Path(path.replace("\\", "/")).as_posix().lower()
+
+class Pak:
+    # a vpk that can be read from several threads at once. every thread opens its own handles to the archives
+    # so they never have to share a file position.
+    # reads the entries of the vpk's tree with its private _make_meta_dict and _make_vpkfile_path, which is why
+    # requirements.txt pins the version of vpk this was tested with. check them again when updating it
+    def __init__(self, path):
+        self.path = path
+        self.vpk = vpk.open(path)
+        self.local = local()
+        self.lock = Lock()
+        # thread -> the handles it opened
+        self.handles = {}
+
+    def entries(self):
+        # path and metadata of every file in the vpk
+        self.vpk.read_index()
+        return self.vpk.tree.items()
+
+    def stamp(self):
+        return (getmtime(self.path), getsize(self.path))
+
+    def handle(self, archive):
+        handles = getattr(self.local, "handles", None)
+        if handles is None:
+            handles = self.local.handles = {}
+        if archive not in handles:
+            handles[archive] = open(archive, "rb")
+            with self.lock:
+                self.handles[current_thread()] = handles
+        return handles[archive]
+
+    def read(self, entry, size=-1):
+        # reads the whole file, or only its first bytes if a size is given
+        meta = self.vpk._make_meta_dict(entry)
+        data = meta["preload"] if size < 0 else meta["preload"][:size]
+        length = meta["file_length"] if size < 0 else min(meta["file_length"], size - len(data))
+        if length > 0:
+            file = self.handle(self.vpk._make_vpkfile_path(meta))
+            file.seek(meta["archive_offset"])
+            data += file.read(length)
+        return data
+
+    def locate(self, entry):
+        meta = self.vpk._make_meta_dict(entry)
+        return (self.vpk._make_vpkfile_path(meta), meta["archive_offset"], meta["file_length"], meta["preload"])
+
+    def close(self, threads=None):
+        # closes the handles opened by the given threads, or by every thread. only the handles of threads that are
+        # done reading should be closed, the pak can be shared by maps that are converted at the same time
+        with self.lock:
+            for thread in list(self.handles) if threads is None else threads:
+                handles = self.handles.pop(thread, {})
+                for file in handles.values():
+                    file.close()
+                handles.clear()
+        if threads is None:
+            self.local = local()
+
+def dirStamp(dir):
+    # modification time of the game dir and every folder in it that gets indexed. adding, removing or renaming
+    # a file changes the time of the folder it's in, so this is enough to tell if the index is out of date
+    stamp = {".": getmtime(dir)}
+    for folder in INDEXED_FOLDERS:
+        for root, _, _ in walk(f"{dir}/{folder}"):
+            stamp[relpath(root, dir)] = getmtime(root)
+    return stamp
+
 class SourceDir:
-    def __init__(self):
+    def __init__(self, threads=EXTRACT_THREADS):
         self.dirs = []
-        self.paks = [vpk.VPK]
+        self.paks = []
+        self.threads = threads
+        # lowercase asset path -> (mount, real path, vpk metadata), see buildIndex
+        self.index = None
 
     def add(self, path):
         if isfile(path):
             if not path.endswith(".vpk"):
                 print(f"\"{path}\" is not a valid file.")
                 exit()
-            self.paks.append(vpk.open(path))
+            self.paks.append(Pak(path))
         elif isdir(path):
             self.dirs.append(path)
         else:
             print(f"\"{path}\" is an invalid path.")
-    
-    def copy(self, src, dest, silent=False):
-        src = Path(src).as_posix()
+            return
+        self.index = None
+
+    def mounts(self):
+        # vpks always take precedence over game dirs, otherwise whatever was mounted first wins
+        return [("vpk", pak.path) for pak in self.paks] + [("dir", dir) for dir in self.dirs]
+
+    def buildIndex(self):
+        start = perf_counter()
+        files = {}
+        stamps = []
+        mount = 0
         for pak in self.paks:
-            try:
-                pak.get_file(src).save(dest)
-            except:
-                continue
-            else:
-                return True
-        
+            for path, entry in pak.entries():
+                key = normalizePath(path)
+                if key not in files:
+                    files[key] = (mount, path, entry)
+            stamps.append(pak.stamp())
+            mount += 1
         for dir in self.dirs:
+            for folder in INDEXED_FOLDERS:
+                for root, _, names in walk(f"{dir}/{folder}"):
+                    root = relpath(root, dir)
+                    for name in names:
+                        path = Path(f"{root}/{name}").as_posix()
+                        key = normalizePath(path)
+                        if key not in files:
+                            files[key] = (mount, path, None)
+            stamps.append(dirStamp(dir))
+            mount += 1
+        self.index = {"version": INDEX_VERSION, "mounts": self.mounts(), "stamps": stamps, "files": files}
+        print(f"Indexed {len(files)} files in {perf_counter() - start:.2f}s")
+
+    def saveIndex(self, path=INDEX_FILE):
+        makedirs(dirname(path), 0o700, exist_ok=True)
+        with open(path, "wb") as file:
+            marshal.dump(self.index, file)
+
+    def loadIndex(self, path=INDEX_FILE):
+        # returns False if there's no saved index or it doesn't match what's currently mounted
+        try:
+            with open(path, "rb") as file:
+                index = marshal.load(file)
+            if index["version"] != INDEX_VERSION or index["mounts"] != self.mounts():
+                return False
+            stamps = [pak.stamp() for pak in self.paks] + [dirStamp(dir) for dir in self.dirs]
+            if stamps != index["stamps"]:
+                return False
+        except:
+            return False
+        self.index = index
+        print(f"Loaded index of {len(index['files'])} files")
+        return True
+
+    def cachedIndex(self, path=INDEX_FILE):
+        if not self.loadIndex(path):
+            self.buildIndex()
+            self.saveIndex(path)
+
+    def resolve(self, src):
+        # (source, real path, vpk metadata) of the mount an asset comes from, or None if no mount has it
+        if self.index is None:
+            self.buildIndex()
+        found = self.index["files"].get(normalizePath(src))
+        if found is None:
+            return None
+        mount, path, entry = found
+        if mount < len(self.paks):
+            return self.paks[mount], path, entry
+        return self.dirs[mount - len(self.paks)], path, entry
+    
+    def read(self, src, size=-1):
+        # contents of an asset without extracting it, or only its first bytes if a size is given.
+        # returns None if it couldn't be found
+        found = self.resolve(src)
+        if found is None:
+            return None
+        source, path, entry = found
+        if entry is not None:
+            return source.read(entry, size)
+        try:
+            with open(f"{source}/{path}", "rb") as file:
+                return file.read(size)
+        except FileNotFoundError:
+            return None
+
+    def locate(self, src):
+        # (file, offset, length, preload) of an asset, or None if it couldn't be found. see viewAsset
+        found = self.resolve(src)
+        if found is None:
+            return None
+        source, path, entry = found
+        if entry is not None:
+            return source.locate(entry)
+        return (f"{source}/{path}", 0, None, None)
+
+    def view(self, src, silent=False):
+        # contents of an asset as a memoryview, without writing it anywhere
+        location = self.locate(src)
+        if location is not None:
+            try:
+                return viewAsset(location)
+            except FileNotFoundError:
+                pass
+        if not silent:
+            print(f"Could not find file {Path(src).as_posix()}")
+        return None
+
+    def viewAll(self, files, silent=False):
+        # views of a list of assets, read on a pool of threads. returns a dict of the ones that were found
+        if self.index is None:
+            self.buildIndex()
+        files = list(dict.fromkeys(files))
+        res = {}
+        with ThreadPool(self.threads) as pool:
+            for src, view in zip(files, pool.imap(lambda src: self.view(src, silent), files)):
+                if view is not None:
+                    res[src] = view
+        return res
+
+    def close(self):
+        # closes the handles every thread opened to the vpks, for when nothing reads from them anymore
+        for pak in self.paks:
+            pak.close()
+
+    def copy(self, src, dest, silent=False):
+        return self.copyFile(src, dest, silent) is not None
+
+    def copyFile(self, src, dest, silent=False):
+        # returns the size of the copied file, or None if it couldn't be found
+        found = self.resolve(src)
+        if found is not None:
+            source, path, entry = found
+            if entry is not None:
+                data = source.read(entry)
+                open(dest, "wb").write(data)
+                return len(data)
             try:
-                copyfile(f"{dir}/{src}", dest)
-            except:
-                continue
+                copyfile(f"{source}/{path}", dest)
+            except FileNotFoundError:
+                pass
             else:
-                return True
-        
+                return getsize(dest)
+
         if not silent:
-            print(f"Could not find file {src}")
-        return False
\ No newline at end of file
+            print(f"Could not find file {Path(src).as_posix()}")
+        return None
+
+    def copyAll(self, files, silent=False):
+        # copies a list of (src, dest) pairs on a pool of threads and returns the set of dests that were written.
+        # files that are asked for more than once are only copied once. copies to the same dest still happen
+        # in the order they were asked for, on the same thread, so the last one that exists wins like before
+        if self.index is None:
+            self.buildIndex()
+        jobs = {}
+        for src, dest in files:
+            if dest not in jobs:
+                jobs[dest] = []
+            if src not in jobs[dest]:
+                jobs[dest].append(src)
+
+        # the threads of the pool, their handles are closed once they're done
+        threads = set()
+
+        def copyJob(job):
+            threads.add(current_thread())
+            dest, srcs = job
+            found = False
+            size = 0
+            for src in srcs:
+                res = self.copyFile(src, dest, silent)
+                if res is not None:
+                    found = True
+                    size = res
+            return dest, found, size
+
+        start = perf_counter()
+        copied = set()
+        total = 0
+        with ThreadPool(self.threads) as pool:
+            for dest, found, size in pool.imap_unordered(copyJob, jobs.items()):
+                if found:
+                    copied.add(dest)
+                    total += size
+        for pak in self.paks:
+            pak.close(threads)
+        elapsed = max(perf_counter() - start, 1e-6)
+
+        mb = total / (1024 * 1024)
+        print(f"Extracted {len(copied)} files ({mb:.2f} MB) in {elapsed:.2f}s, {len(copied) / elapsed:.1f} files/s, {mb / elapsed:.2f} MB/s")
+        return copied
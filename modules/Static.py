@@ -1,7 +1,8 @@
 from .Vector3 import Vector3
 from .Side import Side
 from math import pi as PI, isnan
-from os.path import basename, splitext
+from os.path import basename, splitext, expanduser
+import os
 import re
 
 def deg2rad(deg: float):
@@ -11,9 +12,9 @@ def rad2deg(rad: float):
     return rad * (180 / PI)
 
 def getPlaneIntersectıon(side1: Side, side2: Side, side3: Side) -> Vector3:
-    normal1: Vector3 = side1.normal().normalize()
-    normal2: Vector3 = side2.normal().normalize()
-    normal3: Vector3 = side3.normal().normalize()
+    normal1: Vector3 = side1.unitNormal()
+    normal2: Vector3 = side2.unitNormal()
+    normal3: Vector3 = side3.unitNormal()
     determinant = (
         (
             normal1.x * normal2.y * normal3.z +
@@ -45,19 +46,27 @@ def uniqueName(name: str):
 
 # some vmt files are written so badly, we have to fix them make sure they will be parsed correctly
 def fixVmt(vmt: str):
-    result = "";
-    lines = vmt.replace("\t", " ").replace("\\", "/").replace(".vtf", "").split("\n");
+    # see VmtReader.parseVmt for reading a vmt without writing it out again
+    result = []
+    lines = vmt.replace("\t", " ").replace("\\", "/").replace(".vtf", "").split("\n")
     for line in lines:
         line = line.replace('"', " ").strip().lower()
         if len(line) == 0 or line.startswith("/"):
             continue
-        line = " ".join(line.split())
         tok = line.split()
         if len(tok) == 1:
-            result += line + "\n"
+            result.append(tok[0] + "\n")
             continue
         key = tok[0]
         value = " ".join(tok[1:])
-        line = f'"{key}" "{value}"'
-        result += line + "\n"
-    return result;
\ No newline at end of file
+        result.append(f'"{key}" "{value}"\n')
+    return "".join(result)
+
+def userCacheDir():
+    # caches that are kept between runs. they're only read back by the user that wrote them, anyone can write to
+    # the temp folder
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or expanduser("~/AppData/Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or expanduser("~/.cache")
+    return f"{base}/corvid"
\ No newline at end of file
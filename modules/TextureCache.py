@@ -0,0 +1,98 @@
+import os
+import threading
+from os.path import exists, getsize, getmtime
+from shutil import copyfile, rmtree
+from hashlib import sha1
+from .Static import userCacheDir
+
+# kept in the user's own cache dir, the temp folder gets wiped and anyone can put textures in it
+CACHE_DIR = f"{userCacheDir()}/textures"
+# the least recently used textures get removed when the cache grows bigger than this
+CACHE_SIZE = 4 * 1024 * 1024 * 1024
+
+class TextureCache:
+    # converted textures, stored by the hash of the vtf they came from and how they were converted.
+    # the modification time of a file is when it was last used
+    def __init__(self, dir=CACHE_DIR, maxSize=CACHE_SIZE, enabled=True):
+        self.dir = dir
+        self.maxSize = maxSize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            os.makedirs(dir, 0o700, exist_ok=True)
+
+    def hash(self, vtf: bytes):
+        # the hash of a vtf, every image converted from it gets its key from this, see key()
+        return sha1(vtf)
+
+    def key(self, vtfHash, ext, format, invert):
+        hash = vtfHash.copy()
+        hash.update(f"|{ext}|{format}|{invert}".encode())
+        return f"{hash.hexdigest()}.{ext}"
+
+    def get(self, key, dest):
+        # copies the cached texture to dest, returns False if it's not in the cache
+        if not self.enabled:
+            return False
+        path = f"{self.dir}/{key}"
+        try:
+            os.utime(path)
+            # copied, not linked, so changing the converted file can't change what's in the cache
+            copyfile(path, dest)
+        except FileNotFoundError:
+            # not in the cache, or evicted by another map that's being converted at the same time
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key, src):
+        if not self.enabled or not exists(src):
+            return
+        path = f"{self.dir}/{key}"
+        # another map may be converting the same texture at the same time, in another process or thread
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        copyfile(src, temp)
+        os.replace(temp, path)
+
+    def evict(self):
+        if not self.enabled:
+            return
+        files = []
+        for name in os.listdir(self.dir):
+            path = f"{self.dir}/{name}"
+            try:
+                files.append((getmtime(path), getsize(path), path))
+            except FileNotFoundError:
+                pass
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        removed = 0
+        for _, size, path in files:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed > 0:
+            print(f"Removed {removed} textures from the cache")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def report(self):
+        if not self.enabled:
+            print("Texture cache is disabled")
+            return
+        total = self.hits + self.misses
+        print(f"Texture cache: {self.hits} hits, {self.misses} misses ({self.hits / total * 100 if total > 0 else 0:.1f}% hit rate)")
+
+    def purge(self):
+        rmtree(self.dir, ignore_errors=True)
+        if self.enabled:
+            os.makedirs(self.dir, 0o700, exist_ok=True)
+        print(f"Purged the texture cache in \"{self.dir}\"")
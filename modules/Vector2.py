@@ -1,6 +1,8 @@
 from math import pow, sqrt
 
 class Vector2:
+    __slots__ = ("x", "y")
+
     def __init__(self, a: float = float(0.0), b: float = float(0.0)):
         self.x = float(a)
         self.y = float(b)
@@ -29,6 +31,42 @@ class Vector2:
         else:
             return Vector2(self.x / rhs, self.y / rhs)
 
+    def __iadd__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x += rhs.x
+            self.y += rhs.y
+        else:
+            self.x += rhs
+            self.y += rhs
+        return self
+
+    def __isub__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x -= rhs.x
+            self.y -= rhs.y
+        else:
+            self.x -= rhs
+            self.y -= rhs
+        return self
+
+    def __imul__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x *= rhs.x
+            self.y *= rhs.y
+        else:
+            self.x *= rhs
+            self.y *= rhs
+        return self
+
+    def __itruediv__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x /= rhs.x
+            self.y /= rhs.y
+        else:
+            self.x /= rhs
+            self.y /= rhs
+        return self
+
     def __eq__(self, rhs):
         if isinstance(rhs, self.__class__):
             return (self - rhs).len() <= 0.01
@@ -37,6 +75,9 @@ class Vector2:
     def __str__(self):
         return f"{self.x} {self.y}"
 
+    def __reduce__(self):
+        return (Vector2, (self.x, self.y))
+
     def dot(self, rhs):
         return (self.x * rhs.x) + (self.y * rhs.y)
 
@@ -1,6 +1,9 @@
 from math import pi, pow, sqrt
 
 class Vector3:
+    # maps hold millions of these, slots keep them small
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, a: float = float(0.0), b: float = float(0.0), c: float = float(0.0)):
         self.x = float(a) + 0
         self.y = float(b) + 0
@@ -30,14 +33,64 @@ class Vector3:
         else:
             return Vector3(self.x / rhs, self.y / rhs, self.z / rhs)
 
+    # in-place versions for hot loops, they modify the vector instead of creating a new one
+    def __iadd__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x += rhs.x
+            self.y += rhs.y
+            self.z += rhs.z
+        else:
+            self.x += rhs
+            self.y += rhs
+            self.z += rhs
+        return self
+
+    def __isub__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x -= rhs.x
+            self.y -= rhs.y
+            self.z -= rhs.z
+        else:
+            self.x -= rhs
+            self.y -= rhs
+            self.z -= rhs
+        return self
+
+    def __imul__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x *= rhs.x
+            self.y *= rhs.y
+            self.z *= rhs.z
+        else:
+            self.x *= rhs
+            self.y *= rhs
+            self.z *= rhs
+        return self
+
+    def __itruediv__(self, rhs):
+        if isinstance(rhs, self.__class__):
+            self.x /= rhs.x
+            self.y /= rhs.y
+            self.z /= rhs.z
+        else:
+            self.x /= rhs
+            self.y /= rhs
+            self.z /= rhs
+        return self
+
     def __eq__(self, rhs):
         if isinstance(rhs, self.__class__):
-            return (self - rhs).len() <= 0.01
+            x, y, z = self.x - rhs.x, self.y - rhs.y, self.z - rhs.z
+            return sqrt(x * x + y * y + z * z) <= 0.01
         return False
 
     def __str__(self):
         return f"{self.x} {self.y} {self.z}"
 
+    # brushes get sent to worker processes, this keeps the pickles small and fast
+    def __reduce__(self):
+        return (Vector3, (self.x, self.y, self.z))
+
     def abs(self):
         return Vector3(abs(self.x), abs(self.y), abs(self.z))
 
@@ -78,10 +131,24 @@ class Vector3:
     def isLegal(self, sides):
         for side in sides:
             facing = (self - side.center()).normalize()
-            if facing.dot(side.normal().normalize()) < -0.001:
+            if facing.dot(side.unitNormal()) < -0.001:
                 return False
         return True
 
 def Vector3FromStr(string: str):
     tok = string.split(" ")
     return Vector3(tok[0], tok[1], tok[2])
+
+_brackets = str.maketrans("()[]", "    ")
+
+def Vector3ListFromStr(string: str):
+    # reads every vector in a vmf field at once, like the points of a plane "(0 0 0) (1 0 0) (1 1 0)"
+    # or a row of displacement normals "0 0 1 0 0 1 ..."
+    tok = [float(val) + 0 for val in string.translate(_brackets).split()]
+    res = []
+    new = Vector3.__new__
+    for i in range(0, len(tok) - 2, 3):
+        vec = new(Vector3)
+        vec.x, vec.y, vec.z = tok[i], tok[i + 1], tok[i + 2]
+        res.append(vec)
+    return res
@@ -0,0 +1,32 @@
+import numpy as np
+
+# the most decimals a mesh vertex can be written with, more than that is beyond what a double holds anyway
+MAX_PRECISION = 15
+
+
+def checkPrecision(precision):
+    # None writes the vertices with every digit, like str(Vector3) does
+    if precision is not None and (not isinstance(precision, int) or precision < 0 or precision > MAX_PRECISION):
+        raise ValueError(f"Vertex precision has to be between 0 and {MAX_PRECISION} decimals, got {precision}")
+    return precision
+
+def vertexStrings(pos, uv, lm, precision=None):
+    # the "x y z" and "u v lu lv" parts of the vertex lines of a mesh, from (vertices, 3) positions and
+    # (vertices, 2) uvs and lightmap coordinates. they can be arrays or lists of tuples
+    if precision is None:
+        if isinstance(pos, np.ndarray):
+            pos, uv, lm = pos.tolist(), uv.tolist(), lm.tolist()
+        return [
+            (f"{x} {y} {z}", f"{u} {v} {lu} {lv}")
+            for (x, y, z), (u, v), (lu, lv) in zip(pos, uv, lm)
+        ]
+
+    # everything is rounded in one go, and the shorter numbers are faster to format too. adding 0 turns -0.0 into 0.0
+    if isinstance(pos, np.ndarray):
+        values = np.hstack((pos, uv, lm))
+    else:
+        values = np.array([(x, y, z, u, v, lu, lv) for (x, y, z), (u, v), (lu, lv) in zip(pos, uv, lm)], dtype=np.float64)
+    return [
+        (f"{x} {y} {z}", f"{u} {v} {lu} {lv}")
+        for x, y, z, u, v, lu, lv in (np.round(values, precision) + 0.0).tolist()
+    ]
@@ -0,0 +1,76 @@
+from math import floor, sqrt
+from .Vector3 import Vector3
+
+# two vertices closer than this are welded together, same tolerance as Vector3.__eq__
+WELD_DISTANCE = 0.01
+# size of the grid cells the vertices are hashed into
+CELL_SIZE = 1.0
+
+
+class VertexTable:
+    # welds vertices that are close to each other so neighbouring faces share the exact same coordinates.
+    # vertices are put in the grid cell they fall in, and a lookup only checks the cells the tolerance reaches
+    def __init__(self):
+        self.cells = {}
+        self.count = 0
+        self.merges = 0
+
+    def cellRange(self, value: float):
+        low, high = floor((value - WELD_DISTANCE) / CELL_SIZE), floor((value + WELD_DISTANCE) / CELL_SIZE)
+        return (low,) if low == high else (low, high)
+
+    def cellKeys(self, vert: Vector3):
+        # all the cells a vertex within welding distance could be in. almost always just one
+        xs, ys, zs = self.cellRange(vert.x), self.cellRange(vert.y), self.cellRange(vert.z)
+        if len(xs) == 1 and len(ys) == 1 and len(zs) == 1:
+            return ((xs[0], ys[0], zs[0]),)
+        return tuple((x, y, z) for x in xs for y in ys for z in zs)
+
+    def find(self, vert: Vector3):
+        # the vertex that was added first wins when more than one is in range
+        found, foundIndex = None, self.count
+        for key in self.cellKeys(vert):
+            cell = self.cells.get(key)
+            if cell is None:
+                continue
+            for index, point in cell:
+                if index > foundIndex:
+                    break
+                dx, dy, dz = point.x - vert.x, point.y - vert.y, point.z - vert.z
+                if sqrt(dx * dx + dy * dy + dz * dz) <= WELD_DISTANCE:
+                    found, foundIndex = point, index
+                    break
+        return found
+
+    def add(self, vert: Vector3):
+        point = self.find(vert)
+        if point is not None:
+            self.merges += 1
+            return point
+        key = (floor(vert.x / CELL_SIZE), floor(vert.y / CELL_SIZE), floor(vert.z / CELL_SIZE))
+        if key in self.cells:
+            self.cells[key].append((self.count, vert))
+        else:
+            self.cells[key] = [(self.count, vert)]
+        self.count += 1
+        return vert
+
+    def stats(self):
+        occupancy = [len(cell) for cell in self.cells.values()]
+        return {
+            "vertices": self.count,
+            "merges": self.merges,
+            "cells": len(self.cells),
+            "averageOccupancy": self.count / len(self.cells) if len(self.cells) > 0 else 0,
+            "maxOccupancy": max(occupancy) if len(occupancy) > 0 else 0
+        }
+
+
+class WeldedVertices:
+    # stands in for a VertexTable in worker processes. welding depends on the order vertices come in,
+    # so the main process welds everything up front and the workers get the results handed out in the same order
+    def __init__(self, vertices: list):
+        self.vertices = iter(vertices)
+
+    def add(self, vert: Vector3):
+        return next(self.vertices)
@@ -0,0 +1,73 @@
+from io import StringIO
+from time import perf_counter, process_time
+from vmf_tool.parser import Namespace, pluralise
+
+# blocks at the top of the vmf that are handed out as soon as they're closed instead of being kept around
+STREAMED = ("world", "entity")
+
+
+def readVmf(vmf, stats: dict = None):
+    # reads a vmf (a string or a file) in one pass and yields its blocks as soon as they've been read:
+    # ("solid", solid) for every brush of the world, ("world", world) with the rest of the world's keys
+    # once it's closed and ("entity", entity) for every entity. the blocks are the same Namespaces
+    # vmf_tool.parser.parse would build, but only the block that's being read is kept in memory.
+    # the size of the vmf and the time spent reading it are put in stats at the end
+    if isinstance(vmf, str):
+        vmf = StringIO(vmf)
+
+    start, cpu = perf_counter(), process_time()
+    size = 0
+    root = Namespace()
+    # the blocks that are open, and what they're yielded as when they're closed (None if they aren't)
+    stack = [(root, None)]
+    previous = ""
+    # the keys of the innermost open block, written to directly since that's a lot faster than going through Namespace
+    fields = root.__dict__
+    for number, line in enumerate(vmf):
+        size += len(line)
+        line = line.strip()
+        if line == "" or line.startswith("//"):
+            continue
+        elif line == "{":
+            target, parent = stack[-1]
+            name = previous.strip('"')
+            block = Namespace()
+            block._line = number
+            kind = None
+            if len(stack) == 1 and name in STREAMED:
+                kind = name
+            elif parent == "world" and name == "solid":
+                kind = "solid"
+            else:
+                # a name used more than once turns into a list, the same way vmf_tool does it
+                plural = pluralise(previous)
+                if name in target:
+                    target[plural] = [target[name], block]
+                    del target.__dict__[name]
+                elif plural in target:
+                    target[plural].append(block)
+                else:
+                    target[name] = block
+            stack.append((block, kind))
+            fields = block.__dict__
+        elif line == "}":
+            block, kind = stack.pop()
+            fields = stack[-1][0].__dict__
+            if kind is not None:
+                # the time spent on the block by whoever is reading the stream doesn't count towards the speed
+                paused, cpuPaused = perf_counter(), process_time()
+                yield kind, block
+                start += perf_counter() - paused
+                cpu += process_time() - cpuPaused
+        elif '" "' in line:
+            key, value = line.split('" "')
+            fields[key.lstrip('"')] = value.rstrip('"')
+        elif line.count(" ") == 1:
+            key, value = line.split()
+            fields[key] = value
+        previous = line
+
+    elapsed = perf_counter() - start
+    if stats is not None:
+        stats.update({"bytes": size, "wall": elapsed, "cpu": process_time() - cpu})
+    print(f"Read {size / 1e6:.1f} MB of vmf in {elapsed:.2f}s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
@@ -0,0 +1,57 @@
+import re
+from collections import OrderedDict
+from .vdfutils import parse_vdf, VDFConsistencyError
+from .Static import fixVmt
+
+# the parts of an unquoted token, braces are tokens of their own even when there's no space around them
+BRACES = re.compile(r"[{}]|[^{}]+")
+
+
+def parseVmt(vmt: str):
+    # the same as parse_vdf(fixVmt(vmt)), without writing out the fixed vmt and going through it a character at a time.
+    # after fixVmt every line is either a single unquoted token or a quoted key and value, and there are no backslashes
+    # left to unescape, so the tokens can be taken straight out of the lines
+    text = vmt.replace("\\", "/").replace(".vtf", "").replace('"', " ").lower()
+    stack = [OrderedDict()]
+    key = None
+    for line in text.split("\n"):
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0].startswith("/"):
+            continue
+        if len(tokens) > 1:
+            # fixVmt quotes these, so even braces are just text
+            value = " ".join(tokens[1:])
+            if key is None:
+                stack[-1][tokens[0]] = value
+            else:
+                stack[-1][key] = tokens[0]
+                key = value
+            continue
+        token = tokens[0]
+        if "/" in token:
+            # a comment that starts in the middle of a token, parse_vdf carries the token on to the next line
+            return parse_vdf(fixVmt(vmt))
+        for part in BRACES.findall(token) if "{" in token or "}" in token else (token,):
+            if part == "{":
+                if key is None:
+                    raise VDFConsistencyError("Brackets without heading!")
+                block = OrderedDict()
+                stack[-1][key] = block
+                stack.append(block)
+                key = None
+            elif part == "}":
+                if len(stack) == 1:
+                    raise VDFConsistencyError("Mismatched brackets!")
+                if key is not None:
+                    raise VDFConsistencyError(f"Key '{key}' without value!")
+                stack.pop()
+            elif key is None:
+                key = part
+            else:
+                stack[-1][key] = part
+                key = None
+    if len(stack) > 1:
+        raise VDFConsistencyError("Mismatched brackets!")
+    if key is not None:
+        raise VDFConsistencyError(f"Key '{key}' without value!")
+    return stack[0]
@@ -0,0 +1,72 @@
+from .Vector3 import Vector3
+
+# every face starts as a huge square on its plane and gets clipped by the rest of the brush's planes.
+# it has to be bigger than any map can be (hammer's limit is 16384 units in each direction)
+WINDING_SIZE = 131072.0
+# how far behind a plane a point can be before it's considered outside of the brush
+CLIP_EPSILON = 0.01
+
+FRONT, BACK, ON = 0, 1, 2
+
+# a winding is a list of (point, plane) pairs where plane is the index of the side
+# the edge going from that point to the next one lies on. edges of the base winding have no plane (None)
+
+def baseWinding(normal: Vector3, dist: float):
+    # pick the axis the normal is the least aligned with to build the square on the plane
+    x, y, z = abs(normal.x), abs(normal.y), abs(normal.z)
+    if z >= x and z >= y:
+        up = Vector3(1, 0, 0)
+    else:
+        up = Vector3(0, 0, 1)
+    up = (up - normal * up.dot(normal)).normalize()
+    right = up.cross(normal)
+    origin = normal * dist
+    up = up * WINDING_SIZE
+    right = right * WINDING_SIZE
+    return [
+        (origin - right + up, None),
+        (origin + right + up, None),
+        (origin + right - up, None),
+        (origin - right - up, None)
+    ]
+
+def clipWinding(winding: list, normal: Vector3, dist: float, plane: int):
+    # keeps the part of the winding in front of the plane (which is the inside of a brush)
+    sides = []
+    dists = []
+    hasFront = hasBack = False
+    for point, _ in winding:
+        d = normal.x * point.x + normal.y * point.y + normal.z * point.z - dist
+        dists.append(d)
+        if d > CLIP_EPSILON:
+            sides.append(FRONT)
+            hasFront = True
+        elif d < -CLIP_EPSILON:
+            sides.append(BACK)
+            hasBack = True
+        else:
+            sides.append(ON)
+
+    if not hasBack:
+        return winding
+    if not hasFront:
+        return []
+
+    res = []
+    count = len(winding)
+    for i in range(count):
+        point, edge = winding[i]
+        j = (i + 1) % count
+        if sides[i] == ON:
+            # the edge leaving this point runs along the clipping plane if the next point gets cut off
+            res.append((point, plane if sides[j] == BACK else edge))
+            continue
+        if sides[i] == FRONT:
+            res.append((point, edge))
+        if sides[j] == ON or sides[j] == sides[i]:
+            continue
+        # the edge crosses the plane, split it
+        nextPoint = winding[j][0]
+        mid = point + (nextPoint - point) * (dists[i] / (dists[i] - dists[j]))
+        res.append((mid, plane if sides[i] == FRONT else edge))
+    return res
@@ -11,6 +11,7 @@ Utilities for processing Valve KeyValue data formats.
 
 __version__ = '4.0.0'
 
+import re
 from collections import OrderedDict
 
 __all__ = (
@@ -53,6 +54,14 @@ ESC_QUOTE = BACKSLASH + QUOTE
 SPACE = ' '
 WHITESPACE = ''.join((SPACE, NEWLINE, TAB))
 
+_ESCAPES = {
+    ESC_BACKSLASH:   BACKSLASH,
+    ESC_NEWLINE:   NEWLINE,
+    ESC_TAB:   TAB,
+    ESC_QUOTE:   QUOTE,
+}
+_ESCAPE_SEQUENCE = re.compile(r'\\[\\nt"]')
+
 
 class VDFError(Exception):
     """ Abstract base Exception for errors that may occur in this module. """
@@ -145,33 +154,11 @@ def _tokenize_vdf(inData, escape=True):
 
         '''
 
-        if not shouldEscape:
+        # Most fields have nothing to escape at all.
+        if not shouldEscape or BACKSLASH not in s:
             return s
 
-        escapeDict = {
-            ESC_BACKSLASH:   BACKSLASH,
-            ESC_NEWLINE:   NEWLINE,
-            ESC_TAB:   TAB,
-            ESC_QUOTE:   QUOTE,
-        }
-
-        sLen = len(s)
-
-        result = []
-
-        i = 0
-        while i < sLen:
-            for seq, char in escapeDict.items():
-                seqLen = len(seq)
-                if s[i:i + seqLen] == seq:
-                    result.append(char)
-                    i += seqLen
-                    break
-            else:
-                result.append(s[i])
-                i += 1
-
-        return ''.join(result)
+        return _ESCAPE_SEQUENCE.sub(lambda match: _ESCAPES[match.group(0)], s)
 
     inData += SPACE     # Forces the last character to be dealt with properly.
 
@@ -16,6 +16,12 @@ setup(
             targetName="Corvid.exe",
             icon="icon.ico",
             base=None
+            ),
+        Executable(
+            "cli.py",
+            targetName="corvid-cli.exe",
+            icon="icon.ico",
+            base=None
             )
     ]
 )
\ No newline at end of file